@@ -0,0 +1,177 @@
+import os
+import tempfile
+
+import numpy as np
+
+from pca.world import World
+from pca.enum import Entity
+from pca.engines.rules import OuterTotalisticRule
+
+# Height of the benchmark worlds
+DEPTH = 8
+
+
+class Case:
+    def __init__(self, name, setup, run, max_size=None):
+        """
+        A benchmarked operation.
+
+        :param name: The case name, e.g. "evolve/conway/array".
+        :param setup: Function of the grid size returning the state given to run, not timed.
+        :param run: The timed function of that state, returning a dict of extra
+            metrics (e.g. {"triangles": n}) or None.
+        :param max_size: The largest grid size run by default, for the cases too
+            slow or too large beyond it (e.g. object storage).
+        """
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.max_size = max_size
+
+
+def heights(size, depth=DEPTH, seed=0):
+    """A smooth random heightmap between 1 and depth - 2."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 4 * np.pi, size)
+    phase = rng.uniform(0, 2 * np.pi, 2)
+    surface = np.sin(x[:, None] + phase[0]) + np.cos(0.7 * x[None, :] + phase[1])
+    return (1 + (surface + 2) / 4 * (depth - 3)).astype(int)
+
+
+def make_world(size, storage="array", **options):
+    return World(size, size, DEPTH, storage=storage, headless=True, seed=0, **options)
+
+
+def terrain_world(size, entity=Entity.COLORFUL_TERRAIN, storage="array", **options):
+    world = make_world(size, storage, **options)
+    world.set_terrain_with_heightmap(entity, heights(size))
+    return world
+
+
+def conway_world(size, storage):
+    world = make_world(size, storage)
+    world.set_terrain_with_heightmap(Entity.CONWAY_CUBE, np.ones((size, size), dtype=int))
+    types, states = world.state_arrays()
+    states[:, :, 0] = np.random.default_rng(0).random((size, size)) < 0.3
+    world.load_state(types, states)
+    return world
+
+
+def magic_world(size, storage):
+    return terrain_world(size, Entity.MAGIC_TERRAIN, storage)
+
+
+def rabbit_world(size, storage):
+    world = terrain_world(size, Entity.TERRAIN, storage)
+    rng = np.random.default_rng(0)
+    xs, ys = np.nonzero(rng.random((size, size)) < 0.05)
+    zs = world.lowest_empty_z(xs, ys)
+    world.set_entities(np.stack([xs, ys, zs], axis=1), Entity.RABBIT)
+    return world
+
+
+def rule_world(size, storage):
+    world = make_world(size, storage)
+    world.register_engine(OuterTotalisticRule.from_string("B5/S45"))
+    types, states = world.state_arrays()
+    alive = np.random.default_rng(0).random(world.grid_size) < 0.2
+    types[alive] = Entity.RULE_CUBE
+    states[alive] = 1
+    world.load_state(types, states)
+    return world
+
+
+def evolve_setup(build, storage):
+    def setup(size):
+        world = build(size, storage)
+        # The first step copies the whole grid to the second buffer
+        world.evolve()
+        # A world where nothing happens would only time the bookkeeping
+        assert world.changed.any(), f"{build.__name__} does not change when evolving"
+        return world
+    return setup
+
+
+def heightmap_setup(size):
+    return make_world(size), heights(size)
+
+
+def heightmap_run(state):
+    world, height_map = state
+    world.set_terrain_with_heightmap(Entity.TERRAIN, height_map)
+
+
+def count_triangles(traces):
+    return sum(len(trace.i) for trace in traces if trace is not None and trace.i is not None)
+
+
+def render_grid_setup(meshing):
+    def setup(size):
+        world = terrain_world(size, meshing=meshing)
+        world.start_rendering()
+        world.renderer.set_elements(world.grid, world.grid_size, world.chunks)
+        return world
+    return setup
+
+
+def render_grid_run(world):
+    # Mesh everything, not only the chunks changed since the last frame
+    world.chunks.mark_all()
+    terrain, entities = world.renderer.render_grid()
+    return {"triangles": count_triangles([terrain, *entities])}
+
+
+# Frames of the figures of the render and write cases
+FRAMES = 3
+
+def animation_setup(size):
+    world = terrain_world(size, Entity.MAGIC_TERRAIN, meshing="greedy")
+    world.generate_frame()
+    for _ in range(FRAMES - 1):
+        world.evolve()
+        world.generate_frame()
+    return world
+
+
+def render_run(world):
+    fig = world.render()
+    return {"triangles": count_triangles(fig.data), "frames": len(fig.frames)}
+
+
+def write_setup(format):
+    def setup(size):
+        fig = animation_setup(size).render()
+        fd, path = tempfile.mkstemp(suffix=f".{format}")
+        os.close(fd)
+        return fig, path
+    return setup
+
+
+def write_run(state):
+    fig, path = state
+    try:
+        if path.endswith(".html"):
+            fig.write_html(path)
+        else:
+            fig.write_json(path)
+        return {"bytes": os.path.getsize(path)}
+    finally:
+        os.remove(path)
+
+
+CASES = [
+    Case("set_terrain_with_heightmap", heightmap_setup, heightmap_run),
+    Case("evolve/conway/array", evolve_setup(conway_world, "array"), World.evolve),
+    Case("evolve/conway/object", evolve_setup(conway_world, "object"), World.evolve, max_size=100),
+    Case("evolve/magic_terrain/array", evolve_setup(magic_world, "array"), World.evolve),
+    Case("evolve/magic_terrain/object", evolve_setup(magic_world, "object"), World.evolve, max_size=100),
+    Case("evolve/rabbit/array", evolve_setup(rabbit_world, "array"), World.evolve),
+    Case("evolve/rabbit/object", evolve_setup(rabbit_world, "object"), World.evolve, max_size=100),
+    Case("evolve/rule/array", evolve_setup(rule_world, "array"), World.evolve),
+    Case("render_grid/cells", render_grid_setup("cells"), render_grid_run, max_size=100),
+    Case("render_grid/vectorized", render_grid_setup("vectorized"), render_grid_run, max_size=500),
+    Case("render_grid/greedy", render_grid_setup("greedy"), render_grid_run),
+    Case("render", animation_setup, render_run, max_size=500),
+    Case("write/html", write_setup("html"), write_run, max_size=500),
+    Case("write/json", write_setup("json"), write_run, max_size=500),
+]
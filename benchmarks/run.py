@@ -0,0 +1,163 @@
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import plotly
+
+from benchmarks.cases import CASES
+
+# python -m benchmarks.run --output results.json
+# python -m benchmarks.run --baseline results.json
+
+DEFAULT_SIZES = (14, 100, 500, 2000)
+
+# Peak memory differences below this are noise, whatever the tolerance
+MEMORY_NOISE = 2**20
+
+
+def measure(case, size, repeat):
+    """
+    Time a case on a grid size, then run it once more under tracemalloc for its
+    peak memory (tracing slows the code down, so it is not timed).
+    """
+    times = []
+    metrics = {}
+    for _ in range(repeat):
+        state = case.setup(size)
+        start = time.perf_counter()
+        metrics = case.run(state) or {}
+        times.append(time.perf_counter() - start)
+        del state
+
+    state = case.setup(size)
+    tracemalloc.start()
+    try:
+        case.run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "case": case.name,
+        "size": size,
+        "time": {
+            "min": min(times),
+            "median": statistics.median(times),
+            "repeat": repeat,
+        },
+        "peak_memory": peak,
+        **metrics,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plotly": plotly.__version__,
+        "platform": platform.platform(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline run, matched by case and size.
+
+    :param tolerance: The relative slowdown (or memory increase) tolerated, e.g. 0.25 for 25%.
+    :return: The list of regression messages.
+    """
+    previous = {(result["case"], result["size"]): result for result in baseline["results"]}
+    regressions = []
+
+    for result in results:
+        old = previous.get((result["case"], result["size"]))
+        if old is None:
+            continue
+
+        # The minimum is the least noisy of the timings
+        ratio = result["time"]["min"] / max(old["time"]["min"], 1e-9)
+        result["baseline_ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append(f"{result['case']} {result['size']}: {ratio:.2f}x slower")
+
+        increase = result["peak_memory"] - old["peak_memory"]
+        if increase > tolerance * old["peak_memory"] and increase > MEMORY_NOISE:
+            regressions.append(
+                f"{result['case']} {result['size']}: peak memory "
+                f"{old['peak_memory'] / 2**20:.1f} -> {result['peak_memory'] / 2**20:.1f} MB"
+            )
+
+    return regressions
+
+
+def print_result(result):
+    line = (
+        f"{result['case']:<30} {result['size']:>5}  "
+        f"{result['time']['min'] * 1000:>10.2f} ms  {result['peak_memory'] / 2**20:>9.1f} MB"
+    )
+    if "triangles" in result:
+        line += f"  {result['triangles']:>10} triangles"
+    if "baseline_ratio" in result:
+        line += f"  ({result['baseline_ratio']:.2f}x baseline)"
+    print(line, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation, meshing and figure writing.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Grid sizes (x and y)")
+    parser.add_argument("--cases", nargs="+", default=None, help="Only run the cases starting with these names")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs of each case")
+    parser.add_argument("--all", action="store_true", help="Ignore the maximum size of the slow cases")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with the results of a previous --output")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Slowdown tolerated against the baseline")
+    args = parser.parse_args(argv)
+
+    cases = [
+        case for case in CASES
+        if args.cases is None or any(case.name.startswith(name) for name in args.cases)
+    ]
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = []
+    regressions = []
+    for case in cases:
+        for size in args.sizes:
+            if case.max_size is not None and size > case.max_size and not args.all:
+                continue
+            result = measure(case, size, args.repeat)
+            if baseline is not None:
+                regressions += compare([result], baseline, args.tolerance)
+            results.append(result)
+            print_result(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
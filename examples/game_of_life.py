@@ -46,6 +46,10 @@ def game_of_life():
         print(i)
         world.evolve()
         world.generate_frame()
+        if world.period is not None:
+            # The next generations would only repeat the same states
+            print(f"Cycle of period {world.period} reached")
+            break
 
     end_time = time.time()
     print(f"processing execution time: {end_time - start_time:.5f} seconds")
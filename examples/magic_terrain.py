@@ -17,7 +17,7 @@ def magic_terrain():
     entities_map = {}
 
     print("World init")
-    world = World(length, width, height)
+    world = World(length, width, height, seed=42)
     world.set_terrain_with_heightmap(Entity.MAGIC_TERRAIN, height_map)
     world.set_entity_with_dict(entities_map)
 
@@ -17,7 +17,7 @@ def opti_terrain():
     entities_map = {}
 
     print("World init")
-    world = World(length, width, height)
+    world = World(length, width, height, storage="array", meshing="vectorized")
     world.set_terrain_with_heightmap(Entity.COLORFUL_TERRAIN, height_map)
     world.set_entity_with_dict(entities_map)
 
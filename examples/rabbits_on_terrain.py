@@ -26,7 +26,7 @@ def rabbbits_on_terrain():
     }
 
     print("World init")
-    world = World(length, width, height)
+    world = World(length, width, height, seed=42)
     world.set_terrain_with_heightmap(Entity.TERRAIN, height_map)
     world.set_entity_with_dict(entities_map)
 
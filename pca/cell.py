@@ -1,4 +1,20 @@
+import numpy as np
+
+def read_only(values):
+    """Return values as a read-only array, for the data shared by all the cells of a type."""
+    array = np.array(values)
+    array.flags.writeable = False
+    return array
+
+
 class Cell:
+    # The per-type data (colors, geometry) is shared at the class or model level
+    __slots__ = ("type", "state", "x", "y", "z", "model")
+
+    # Whether step can change the cell without any change among its direct
+    # neighbors (random behaviors), see World.evolve
+    stochastic = False
+
     def __init__(self, type=0, state=0, x=0, y=0, z=0, model={}):
         """
         Initializes a cell with a specific state and 3D position.
@@ -12,12 +28,31 @@ class Cell:
         self.y = y
         self.z = z
 
+        self.set_model(model)
+
+    def set_model(self, model):
+        """
+        Set the model (geometry) of the cell.
+
+        :param model: The model dict given by the ModelLoader, shared by the cells of a type.
+        """
         self.model = model
 
-        self.mesh = model.get('mesh', None)
-        self.vertices = model.get('vertices', None)
-        self.faces = model.get('faces', None)
-        self.vertex_colors = model.get('vertex_colors', None)
+    @property
+    def mesh(self):
+        return self.model.get('mesh', None)
+
+    @property
+    def vertices(self):
+        return self.model.get('vertices', None)
+
+    @property
+    def faces(self):
+        return self.model.get('faces', None)
+
+    @property
+    def vertex_colors(self):
+        return self.model.get('vertex_colors', None)
 
     def update(self, new_state):
         """
@@ -33,6 +68,15 @@ class Cell:
         You can customize this to show different colors or representations based on the state.
         """
         raise ValueError("Render is not implemented for this cell")
+
+    def instance_geometry(self):
+        """
+        Geometry shared by all the cells of this type, relative to the cell position,
+        as (vertices, faces, vertex_colors). It lets the renderer draw all the cells
+        of a type as a single mesh without calling render on each of them.
+        Cells returning None are batched from their own render output.
+        """
+        return None
     
     def step(self, new_grid, old_grid):
         pass
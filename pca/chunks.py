@@ -0,0 +1,67 @@
+import numpy as np
+
+class ChunkTracker:
+    def __init__(self, grid_size, chunk_size=16):
+        """
+        Splits the world into chunk_size x chunk_size x max_z columns and tracks
+        which of them changed since the renderer last meshed them.
+
+        :param grid_size: The (max_x, max_y, max_z) size of the world.
+        :param chunk_size: The x and y size of a chunk.
+        """
+        self.grid_size = grid_size
+        self.chunk_size = chunk_size
+        self.counts = (
+            -(-grid_size[0] // chunk_size),
+            -(-grid_size[1] // chunk_size),
+        )
+
+        # Everything has to be meshed at first
+        self.dirty = np.ones(self.counts, dtype=bool)
+
+    def bounds(self, cx, cy):
+        """Return the (x0, x1, y0, y1) cell range covered by a chunk."""
+        size = self.chunk_size
+        return (
+            cx * size, min((cx + 1) * size, self.grid_size[0]),
+            cy * size, min((cy + 1) * size, self.grid_size[1]),
+        )
+
+    def mark(self, x, y):
+        """
+        Mark the chunk of a changed cell. The faces of the neighboring cells may
+        change as well, so the chunks of its horizontal neighbors are marked too.
+        """
+        size = self.chunk_size
+        x0, x1 = max(x - 1, 0) // size, min(x + 1, self.grid_size[0] - 1) // size
+        y0, y1 = max(y - 1, 0) // size, min(y + 1, self.grid_size[1] - 1) // size
+        self.dirty[x0:x1 + 1, y0:y1 + 1] = True
+
+    def mark_mask(self, changed):
+        """Mark the chunks of all the cells set in a (X, Y, Z) or (X, Y) boolean mask."""
+        if changed.ndim == 3:
+            changed = changed.any(axis=2)
+        if not changed.any():
+            return
+
+        # Grow the mask by one cell to include the horizontal neighbors
+        grown = changed.copy()
+        grown[1:] |= changed[:-1]
+        grown[:-1] |= changed[1:]
+        column = grown.copy()
+        grown[:, 1:] |= column[:, :-1]
+        grown[:, :-1] |= column[:, 1:]
+
+        size = self.chunk_size
+        padded = np.zeros((self.counts[0] * size, self.counts[1] * size), dtype=bool)
+        padded[:grown.shape[0], :grown.shape[1]] = grown
+        self.dirty |= padded.reshape(self.counts[0], size, self.counts[1], size).any(axis=(1, 3))
+
+    def mark_all(self):
+        self.dirty[...] = True
+
+    def take_dirty(self):
+        """Return the (cx, cy) indices of the dirty chunks and mark them clean."""
+        chunks = np.argwhere(self.dirty)
+        self.dirty[...] = False
+        return chunks
@@ -0,0 +1,280 @@
+import numpy as np
+from pca.display.models import ModelLoader
+from pca.enum import Entity
+
+BOX_MODEL = ModelLoader.create_box_model()
+
+# Neighbor (axis, direction) hiding each face of the box model, two triangles per face
+# face_mapping = ["bottom", "top", "left", "right", "front", "back"]
+FACE_NEIGHBORS = [(2, -1), (2, 1), (0, -1), (0, 1), (1, -1), (1, 1)]
+
+
+def face_geometry(face):
+    """Return the 4 box corners used by the two triangles of a face, and the triangles as indices into them."""
+    triangles = BOX_MODEL['faces'][2 * face:2 * face + 2]
+    corners = np.unique(triangles)
+    return BOX_MODEL['vertices'][corners].astype(np.int32), np.searchsorted(corners, triangles).astype(np.int32)
+
+FACE_CORNERS, FACE_TRIANGLES = zip(*[face_geometry(face) for face in range(6)])
+# Same, stacked to be indexed by arrays of faces
+CORNERS, TRIANGLES = np.stack(FACE_CORNERS), np.stack(FACE_TRIANGLES)
+
+# Entity.is_terrain for every possible uint8 type value
+TERRAIN_LUT = np.array([Entity.is_terrain(value) for value in range(256)], dtype=bool)
+
+
+def exposed_faces(solid):
+    """
+    Compute which faces of the terrain voxels are exposed, for the whole grid at once.
+
+    A face is exposed when the neighbor it touches is out of the grid or is not
+    terrain. Bottom faces are never drawn.
+
+    :param solid: Boolean "is terrain" occupancy array.
+    :return: A (6, X, Y, Z) boolean array, one mask per box face.
+    """
+    masks = np.zeros((6,) + solid.shape, dtype=bool)
+
+    for face, (axis, direction) in enumerate(FACE_NEIGHBORS):
+        if face == 0:
+            continue  # No need for bottom faces
+
+        # neighbor[p] = solid[p + direction], cells outside the grid are empty
+        neighbor = np.zeros_like(solid)
+        target = [slice(None)] * 3
+        source = [slice(None)] * 3
+        if direction > 0:
+            target[axis], source[axis] = slice(None, -1), slice(1, None)
+        else:
+            target[axis], source[axis] = slice(1, None), slice(None, -1)
+        neighbor[tuple(target)] = solid[tuple(source)]
+
+        masks[face] = solid & ~neighbor
+
+    return masks
+
+
+def mesh_terrain(solid, keys, color_table, masks=None, greedy=False, regions=None):
+    """
+    Emit the vertices, faces and face intensities of all the exposed terrain faces.
+
+    :param solid: Boolean "is terrain" occupancy array.
+    :param keys: Per-voxel index into color_table.
+    :param color_table: (K, 12) array of triangle intensities, in box model face order.
+    :param masks: Optional precomputed result of exposed_faces(solid).
+    :param greedy: Merge adjacent coplanar faces with the same intensities into larger quads.
+    :param regions: Optional per-voxel non-negative region ids (e.g. chunks). Quads
+        are not merged across regions and are emitted grouped by region, see split_quads.
+    :return: Integer (n, 3) vertices, (m, 3) faces and (m,) intensities, each quad
+        being 4 consecutive vertices and 2 consecutive faces. With regions, also
+        the (m // 2,) region of each quad.
+    """
+    if masks is None:
+        masks = exposed_faces(solid)
+
+    origins, sizes, quad_faces, intensities = [], [], [], []
+
+    for face in range(1, 6): # No need for bottom faces
+        if not masks[face].any():
+            continue
+
+        if greedy:
+            face_origins, face_sizes, face_intensities = merge_faces(masks[face], keys, color_table, face, regions)
+        else:
+            face_origins = np.argwhere(masks[face]).astype(np.int32)
+            face_sizes = np.ones_like(face_origins)
+            face_intensities = color_table[keys[masks[face]]][:, 2 * face:2 * face + 2]
+
+        origins.append(face_origins)
+        sizes.append(face_sizes)
+        quad_faces.append(np.full(len(face_origins), face, dtype=np.int8))
+        intensities.append(face_intensities)
+
+    if not origins:
+        mesh = np.empty((0, 3), dtype=np.int64), np.empty((0, 3), dtype=np.int64), np.empty(0, dtype=np.int32)
+        return mesh if regions is None else mesh + (np.empty(0, dtype=np.int64),)
+
+    origins = np.concatenate(origins)
+    sizes = np.concatenate(sizes)
+    quad_faces = np.concatenate(quad_faces)
+    intensities = np.concatenate(intensities)
+
+    if regions is not None:
+        quad_regions = regions[tuple(origins.T)]
+        # Ordering the quads is cheaper than ordering their vertices and faces
+        order = np.argsort(quad_regions, kind="stable")
+        origins, sizes, quad_faces, intensities = origins[order], sizes[order], quad_faces[order], intensities[order]
+        quad_regions = quad_regions[order]
+
+    # Corners are scaled along the quad extent (the size is 1 along the face normal)
+    vertices = np.take(CORNERS.astype(origins.dtype), quad_faces, axis=0)
+    if greedy:
+        vertices *= sizes[:, None, :]
+    vertices += origins[:, None, :]
+    faces = np.take(TRIANGLES, quad_faces, axis=0)
+    faces += (4 * np.arange(len(origins), dtype=np.int32))[:, None, None]
+
+    mesh = vertices.reshape(-1, 3), faces.reshape(-1, 3), intensities.reshape(-1)
+    return mesh if regions is None else mesh + (quad_regions,)
+
+
+def split_quads(vertices, faces, intensities, quad_regions):
+    """
+    Split a mesh of mesh_terrain into one mesh per region.
+
+    :param quad_regions: The region of each quad, grouped like mesh_terrain returns them.
+    :return: A dict region -> (vertices, faces, intensities), views of the given arrays.
+    """
+    regions, starts = np.unique(quad_regions, return_index=True)
+    ends = np.append(starts[1:], len(quad_regions))
+
+    meshes = {}
+    for region, start, end in zip(regions.tolist(), starts.tolist(), ends.tolist()):
+        meshes[region] = (
+            vertices[4 * start:4 * end],
+            faces[2 * start:2 * end] - 4 * start,
+            intensities[2 * start:2 * end],
+        )
+    return meshes
+
+
+def merge_faces(mask, keys, color_table, face, regions=None):
+    """
+    Greedy meshing of one face direction: merge the exposed faces into rectangles
+    of faces sharing the same plane and the same intensities.
+
+    Faces are first merged into runs along one in-plane axis, then runs with the
+    same extent and intensities are merged across consecutive rows. Every plane
+    of the grid is processed at once.
+
+    :param mask: Boolean mask of the exposed faces for this face direction.
+    :param regions: Optional per-voxel region ids, faces of different regions are not merged.
+    :return: (n, 3) rectangle origins, (n, 3) sizes and (n, 2) triangle intensities.
+    """
+    normal_axis = FACE_NEIGHBORS[face][0]
+    row_axis, run_axis = [axis for axis in range(3) if axis != normal_axis]
+
+    # Both triangle intensities packed in one label, 0 for a hidden face
+    pairs = color_table[:, 2 * face].astype(np.int64) * 65536 + color_table[:, 2 * face + 1]
+    labels = np.where(mask, pairs[keys] + 1, 0)
+    n_regions = 1
+    if regions is not None:
+        # Faces of different regions get different labels
+        n_regions = int(regions.max()) + 1
+        labels = np.where(mask, labels * n_regions + regions, 0)
+
+    # Planes x rows x runs layout
+    labels = np.transpose(labels, (normal_axis, row_axis, run_axis))
+
+    # Runs along the last axis
+    previous = np.zeros_like(labels)
+    previous[:, :, 1:] = labels[:, :, :-1]
+    following = np.zeros_like(labels)
+    following[:, :, :-1] = labels[:, :, 1:]
+
+    run_starts = np.argwhere((labels != 0) & (labels != previous))
+    if len(run_starts) == 0:
+        return np.empty((0, 3), dtype=np.int64), np.empty((0, 3), dtype=np.int64), np.empty((0, 2), dtype=np.int64)
+
+    run_ends = np.argwhere((labels != 0) & (labels != following))
+    run_labels = labels[tuple(run_starts.T)]
+
+    plane, row, start = run_starts.T
+    end = run_ends[:, 2]
+
+    # Merge identical runs of consecutive rows
+    order = np.lexsort((row, run_labels, end, start, plane))
+    plane, row, start, end, run_labels = plane[order], row[order], start[order], end[order], run_labels[order]
+
+    continues = np.zeros(len(order), dtype=bool)
+    continues[1:] = (
+        (plane[1:] == plane[:-1]) &
+        (start[1:] == start[:-1]) &
+        (end[1:] == end[:-1]) &
+        (run_labels[1:] == run_labels[:-1]) &
+        (row[1:] == row[:-1] + 1)
+    )
+    first = np.flatnonzero(~continues)
+    last = np.append(first[1:] - 1, len(order) - 1)
+
+    count = len(first)
+    origins = np.zeros((count, 3), dtype=np.int64)
+    sizes = np.ones((count, 3), dtype=np.int64)
+
+    origins[:, normal_axis] = plane[first]
+    origins[:, row_axis] = row[first]
+    origins[:, run_axis] = start[first]
+    sizes[:, row_axis] = row[last] - row[first] + 1
+    sizes[:, run_axis] = end[first] - start[first] + 1
+
+    pair = run_labels[first] // n_regions - 1
+    intensities = np.column_stack((pair // 65536, pair % 65536))
+
+    return origins, sizes, intensities
+
+
+# Lattice indices spanned per vertex below which deduplicate_lattice_vertices marks the corners on the lattice
+DENSE_LATTICE = 8
+
+
+def deduplicate_lattice_vertices(vertices, faces, grid_size):
+    """
+    Merge the duplicated vertices of a mesh whose vertices lie on the integer
+    lattice of the grid corners.
+
+    Each vertex is mapped to its linear index in the (X + 1)(Y + 1)(Z + 1)
+    lattice and the used corners are kept in lattice order, so the vertex
+    order only depends on which corners are used and stays stable between frames.
+    Dense meshes mark their corners on the range of lattice indices they span,
+    sparse ones (e.g. a few changed chunks of a large world) sort their corner
+    indices instead, so the work never grows with the volume of the grid.
+
+    :param vertices: Integer-valued (n, 3) vertices within the grid bounds.
+    :param faces: (m, 3) faces indexing the vertices.
+    :param grid_size: The (max_x, max_y, max_z) size of the grid.
+    :return: The unique (k, 3) vertices and the remapped faces.
+    """
+    shape = tuple(size + 1 for size in grid_size)
+    lattice_index = np.ravel_multi_index(vertices.astype(np.intp).T, shape)
+    if len(lattice_index) == 0:
+        return np.empty((0, 3), dtype=np.intp), faces
+
+    low, high = lattice_index.min(), lattice_index.max()
+    if high - low < DENSE_LATTICE * len(lattice_index):
+        offsets = lattice_index - low
+        used = np.zeros(high - low + 1, dtype=bool)
+        used[offsets] = True
+        new_index = (np.cumsum(used, dtype=np.int64) - 1)[offsets]
+        used = np.flatnonzero(used) + low
+    else:
+        used, new_index = np.unique(lattice_index, return_inverse=True)
+
+    unique_vertices = np.column_stack(np.unravel_index(used, shape))
+    return unique_vertices, new_index[faces]
+
+
+def terrain_color_table(types, states, solid, get_colors):
+    """
+    Build the per-voxel keys and the (key -> triangle intensities) table of the terrain.
+
+    :param get_colors: Callable (entity, state, (x, y, z)) -> 12 triangle intensities,
+        called once per (type, state) pair with the position of one voxel holding it.
+    :return: The keys, 0 for the voxels that are not solid, and the table.
+    """
+    solid_states = states[solid].astype(np.int32)
+    # The states of the other voxels can be anything, they are left out of the keys
+    low = int(solid_states.min()) if len(solid_states) else 0
+    n_states = int(solid_states.max()) - low + 1 if len(solid_states) else 1
+    keys = np.zeros(types.shape, dtype=np.int32)
+    keys[solid] = types[solid].astype(np.int32) * n_states + solid_states - low
+
+    color_table = np.zeros((256 * n_states, 12), dtype=np.int32)
+    present = np.flatnonzero(np.bincount(keys[solid], minlength=len(color_table)))
+
+    for key in present:
+        entity, state = divmod(int(key), n_states)
+        state += low
+        position = np.argwhere(solid & (keys == key))[0]
+        color_table[key] = get_colors(entity, state, position)
+
+    return keys, color_table
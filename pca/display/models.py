@@ -1,32 +1,51 @@
 from pca.cell import Cell
 import numpy as np
-import trimesh
-import plotly.graph_objects as go
 from pca.enum import Entity
 from pathlib import Path
+import hashlib
 import os
 
 WORK_DIR = Path.cwd()
 
+DEFAULT_CACHE_DIR = Path(os.environ.get("PCA_CACHE_DIR", Path.home() / ".cache" / "plotly-cellular-automata"))
+
 class ModelLoader():
     file_paths = {
         Entity.RABBIT: "./res/animals/Rabbit/Rabbit_01.obj"
     }
 
-    def __init__(self):
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Loads the models of the entities. Models are loaded lazily on the first
+        get_model call for an entity.
+
+        :param cache_dir: Directory of the preprocessed geometry cache, None to disable it.
+        """
         self.models = {}
-        self.load_all_models()
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.box_model = None
 
     def load_all_models(self):
         for entity, path in self.file_paths.items():
             self.load_obj(entity, path)
 
-        box_model = ModelLoader.create_box_model()
         for ent in Entity:
             if ent not in self.models:
-                self.models[ent] = box_model 
+                self.models[ent] = self.get_box_model()
+
+    def get_box_model(self):
+        if self.box_model is None:
+            self.box_model = ModelLoader.create_box_model()
+        return self.box_model
 
     def load_obj(self, entity, path):
+        cache_path = self.cache_path(path)
+        if cache_path is not None and cache_path.exists():
+            self.models[entity] = ModelLoader.read_cache(cache_path)
+            return
+
+        import trimesh
+
         mesh = trimesh.load_mesh(path)
 
         # Extract vertex and face data
@@ -42,12 +61,67 @@ class ModelLoader():
             'mesh': mesh,
             'vertices': vertices,
             'faces': faces,
-            'vertex_colors': vertex_colors
+            'vertex_colors': vertex_colors,
+            # Normalized once, shared by all the instances of the model
+            'floor_vertices': Cell.normalize_vertices_to_floor(vertices),
         }
 
+        if cache_path is not None:
+            ModelLoader.write_cache(cache_path, self.models[entity])
+
+    def cache_path(self, path):
+        """
+        Cache file of a model, keyed by the size and modification time of the
+        model file and of the files next to it (materials and textures).
+        """
+        if self.cache_dir is None:
+            return None
+
+        source = Path(path)
+        key = hashlib.sha1()
+        for file in sorted(source.parent.iterdir()):
+            if file.is_file():
+                stat = file.stat()
+                key.update(f"{file.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+
+        return self.cache_dir / f"{source.stem}-{key.hexdigest()[:16]}.npz"
+
+    @staticmethod
+    def read_cache(cache_path):
+        with np.load(cache_path) as data:
+            return {
+                'mesh': None,
+                'vertices': data['vertices'],
+                'faces': data['faces'],
+                'vertex_colors': data['vertex_colors'],
+                'floor_vertices': data['floor_vertices'],
+            }
+
+    @staticmethod
+    def write_cache(cache_path, model):
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first so that a concurrent run never reads a partial cache
+        tmp_path = cache_path.with_name(f"{cache_path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(
+            tmp_path,
+            vertices=model['vertices'],
+            faces=model['faces'],
+            vertex_colors=model['vertex_colors'],
+            floor_vertices=model['floor_vertices'],
+        )
+        os.replace(tmp_path, cache_path)
+
     def get_model(self, entity):
 
         model = self.models.get(entity, None)
+        if not model:
+            if entity in self.file_paths:
+                self.load_obj(entity, self.file_paths[entity])
+            elif entity in list(Entity):
+                self.models[entity] = self.get_box_model()
+            model = self.models.get(entity, None)
+
         if not model:
             raise ValueError(f"Model {entity} not found by the ModelLoader")
 
@@ -79,5 +153,6 @@ class ModelLoader():
             'mesh': None,
             'vertices': vertices_np,
             'faces': faces_np,
-            'vertex_colors': None
+            'vertex_colors': None,
+            'floor_vertices': vertices_np,
         }
\ No newline at end of file
@@ -0,0 +1,63 @@
+import numpy as np
+
+from pca.display.meshing import TERRAIN_LUT, deduplicate_lattice_vertices, exposed_faces, mesh_terrain, terrain_color_table
+from pca.recorder import StateRecorder
+from pca.shared import read_shared, start_pool, worker, write_shared
+
+
+def mesh_grid(types, states, get_colors, greedy=False):
+    """
+    Mesh the terrain of a whole grid given by its (types, states) arrays.
+
+    :param get_colors: Callable (entity, state, (x, y, z)) -> 12 triangle intensities.
+    :return: The deduplicated vertices, the faces and the triangle intensities.
+    """
+    solid = TERRAIN_LUT[types]
+    keys, color_table = terrain_color_table(types, states, solid, get_colors)
+    vertices, faces, intensities = mesh_terrain(
+        solid, keys, color_table, masks=exposed_faces(solid), greedy=greedy
+    )
+    vertices, faces = deduplicate_lattice_vertices(vertices, faces, types.shape)
+    return vertices.astype(np.float32), faces, intensities
+
+
+def init_worker(path, world_class, greedy):
+    worker["recorder"] = StateRecorder(path, readonly=True)
+    # Only used to build one cell per (type, state) and read its colors
+    worker["world"] = world_class(1, 1, 1, storage="array", headless=True)
+    worker["colors"] = {}
+    worker["greedy"] = greedy
+
+
+def get_colors(entity, state, position):
+    colors = worker["colors"]
+    if (entity, state) not in colors:
+        _, _, cell_colors = worker["world"].materialize_cell(entity, 0, 0, 0, state).render()
+        colors[(entity, state)] = np.asarray(cell_colors)
+    return colors[(entity, state)]
+
+
+def mesh_step(step):
+    """Mesh a recorded step and return it in a shared memory block, see read_shared."""
+    types, states = worker["recorder"].get(step)
+    arrays = mesh_grid(np.asarray(types), np.asarray(states), get_colors, worker["greedy"])
+    return write_shared(arrays)
+
+
+def mesh_recording(recorder, steps, world_class, greedy=False, processes=None):
+    """
+    Mesh the terrain of recorded steps in a pool of worker processes.
+
+    The workers read the steps from the recorder memory maps and send the meshes
+    back through shared memory instead of pickling them.
+
+    :param recorder: The StateRecorder holding the steps.
+    :param steps: The steps to mesh.
+    :param world_class: The World class, used by the workers to build the cells giving the colors.
+    :param greedy: Merge the coplanar faces like the "greedy" meshing mode.
+    :param processes: The number of worker processes, defaults to the number of cores.
+    :return: An iterator over the (vertices, faces, intensities) of the steps, in order.
+    """
+    with start_pool(processes, init_worker, (recorder.path, world_class, greedy)) as pool:
+        for name, layouts in pool.imap(mesh_step, steps):
+            yield read_shared(name, layouts)
@@ -1,25 +1,60 @@
 import plotly.graph_objects as go
 from pca.cell import Cell
+import time
 import numpy as np
 from pca.enum import Entity
+from pca.grid import ArrayGrid, grid_arrays, object_grid_arrays
+from pca.instrumentation import NULL_INSTRUMENTATION
+from pca.display.meshing import TERRAIN_LUT, deduplicate_lattice_vertices, exposed_faces, mesh_terrain, split_quads, terrain_color_table
+
+# Number of recent frames whose traces can be reused by add_frame
+FRAME_CACHE_SIZE = 32
 
 class Renderer:
-    def __init__(self, grid, grid_size):
+    def __init__(self, grid, grid_size, meshing="vectorized", static_layers=(), instrumentation=None):
         """
         Initializes the Renderer to display the Cellular Automaton World in 3D.
         
         :param ca_world: The world object that holds the grid and automaton logic.
+        :param meshing: "vectorized" culls and emits the faces of all the terrain voxels
+            at once from the typed arrays, only meshing again the chunks changed since
+            the last frame. "greedy" does the same and merges coplanar faces of the same
+            color into larger quads. "cells" meshes the whole terrain cube by cube
+            every frame, with a hover text per cube.
+        :param static_layers: Layers known not to change between frames, only meshed
+            for the first frame. Only "terrain" is supported. Unchanged layers are
+            detected anyway and stored once (see render).
+        :param instrumentation: Optional Instrumentation recording the meshing phases and counters.
         """
+        if meshing not in ("cells", "vectorized", "greedy"):
+            raise ValueError(f"Unknown meshing mode {meshing}")
+
         self.grid = grid
         self.grid_size = grid_size
+        self.meshing = meshing
+        self.static_layers = set(static_layers)
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
         self.frame_cnt = 0
         self.frames = []
+        # FigureWriter the frames are streamed to instead of being kept in self.frames
+        self.writer = None
+        self.chunks = None
         self.render_setup()
 
-    def set_elements(self, grid, grid_size):
+    def set_elements(self, grid, grid_size, chunks=None):
+        """
+        :param chunks: Optional ChunkTracker, the meshes of the chunks it does not
+            report as dirty are reused from the previous frame.
+        """
         self.grid = grid
         self.grid_size = grid_size
 
+        if chunks is not self.chunks:
+            self.chunk_meshes = {}
+            if chunks is not None:
+                chunks.mark_all()
+        self.chunks = chunks
+
     def render_setup(self):
 
         self.fig = go.Figure()
@@ -32,6 +67,24 @@ class Renderer:
 
         self.terrain_mesh = None
         self.entities_meshes = []
+        # Arrays of self.terrain_mesh, to detect an unchanged terrain
+        self.terrain_arrays = None
+
+        # Entity types in order of appearance, one trace each in every frame
+        self.entity_layers = []
+        # entity -> (positions, trace) of the last batched instanced mesh
+        self.entity_traces = {}
+        # Placeholder for the entity types absent from a frame
+        self.empty_trace = go.Mesh3d()
+
+        # (type, state) -> triangle intensities of the terrain cubes
+        self.terrain_colors = {}
+
+        # (cx, cy) -> (vertices, faces, intensities, entity positions) of a chunk
+        self.chunk_meshes = {}
+
+        # State hash -> traces of the last FRAME_CACHE_SIZE distinct states, see add_frame
+        self.frame_cache = {}
 
         # Update layout to improve visualization
         self.fig.update_layout(
@@ -46,29 +99,128 @@ class Renderer:
             scene_aspectmode='data'
         )
 
-    def add_frame(self):
+    def add_frame(self, terrain=None, key=None):
+        """
+        :param terrain: Optional (vertices, faces, intensities) of the terrain already
+            meshed elsewhere (see pca.display.parallel), only the entities are meshed then.
+        :param key: Optional hash of the grid state (see World.state_hash). The traces
+            of a recent frame with the same key are reused instead of meshing again.
+            Ignored while streaming, only the current frame being kept then.
+        """
         # https://stackoverflow.com/questions/69867334/multiple-traces-per-animation-frame-in-plotly
+        if self.writer is not None:
+            key = None
+
+        if key is not None and key in self.frame_cache:
+            # Skipping the meshing leaves the dirty chunks for the next meshed frame
+            data = self.frame_cache.pop(key)
+            self.frame_cache[key] = data
+            self.instrumentation.count("frame/reused")
+            self.append_frame(data)
+            return
+
+        with self.instrumentation.phase("frame/mesh"):
+            if terrain is None:
+                self.terrain_mesh, self.entities_meshes = self.render_grid()
+            else:
+                self.terrain_vertices, self.terrain_faces, self.intensity_values = terrain
+                self.n_vertices = len(self.terrain_vertices)
+                self.n_faces = len(self.terrain_faces)
+                self.terrain_mesh = self.update_terrain_mesh()
+                self.entities_meshes = self.render_entities()
+
+        data = [self.terrain_mesh, *self.entities_meshes]
+        if key is not None:
+            self.frame_cache[key] = data
+            if len(self.frame_cache) > FRAME_CACHE_SIZE:
+                del self.frame_cache[next(iter(self.frame_cache))]
+        self.append_frame(data)
+
+    def append_frame(self, data):
+        name = f'frame_{self.frame_cnt}'
+        self.frame_cnt = self.frame_cnt + 1
+        self.instrumentation.count("frame/traces", len(data))
 
-        self.terrain_mesh, self.entities_meshes = self.render_grid()
+        if self.writer is not None:
+            self.writer.add_frame(name, data)
+            return
 
-        self.frames.append(
-            go.Frame(
-                data=[self.terrain_mesh, *self.entities_meshes],
-                name=f'frame_{self.frame_cnt}'
-            )
-        )
-        self.frame_cnt = self.frame_cnt + 1
+        # The go.Frame objects are only built in render, once the static traces are known.
+        # An unchanged terrain is the same trace object in consecutive frames.
+        self.frames.append({"name": name, "data": data})
+
+    def stream_to(self, path, **options):
+        """
+        Write the next frames to a file as they are produced instead of keeping
+        them for render, see FigureWriter. The file is completed by close_stream.
+
+        :param path: The output .html or .json file.
+        :param options: Options forwarded to the FigureWriter.
+        """
+        from pca.display.writer import FigureWriter
+
+        self.writer = FigureWriter(path, instrumentation=self.instrumentation, **options)
+        # The cached frames are not needed by the streamed ones
+        self.frame_cache = {}
+        return self.writer
+
+    def close_stream(self):
+        """Complete the file of stream_to with the layout and the animation controls."""
+        writer, self.writer = self.writer, None
+        layout = go.Layout(self.fig.layout)
+        layout.update(self.animation_layout(writer.frame_names))
+        writer.close(layout)
+
+    def dynamic_traces(self):
+        """
+        Indices of the traces changing between frames. A trace is static when
+        all the frames hold the very same trace object.
+
+        Frames with fewer traces are padded with an empty mesh so that every
+        trace index refers to the same layer in all the frames.
+        """
+        if not self.frames:
+            return []
+
+        n_traces = max(len(frame["data"]) for frame in self.frames)
+        for frame in self.frames:
+            frame["data"] += [self.empty_trace] * (n_traces - len(frame["data"]))
+
+        first = self.frames[0]["data"]
+        return [
+            i for i, trace in enumerate(first)
+            if any(frame["data"][i] is not trace for frame in self.frames)
+        ]
 
     
     def render(self):
+        with self.instrumentation.phase("render"):
+            # Static traces are only in the base figure, the frames update the other ones
+            dynamic = self.dynamic_traces()
 
-        if self.frame_cnt > 0:
-            self.fig.add_traces(
-                self.frames[0].data
-            )
+            if self.frames:
+                self.fig.add_traces(
+                    self.frames[0]["data"]
+                )
+
+            self.fig.frames = [
+                go.Frame(
+                    data=[frame["data"][i] for i in dynamic],
+                    traces=dynamic,
+                    name=frame["name"]
+                )
+                for frame in self.frames
+            ]
 
-        self.fig.frames = self.frames
+            # Add animation controls to the existing layout
+            self.fig.update_layout(self.animation_layout([f.name for f in self.fig.frames]))
 
+            self.fig.update_traces(showscale=False)
+
+        return self.fig
+    
+    def animation_layout(self, frame_names):
+        """Layout of the play/pause buttons and of the slider over the given frames."""
         def frame_args(duration):
             return {
                 "frame": {"duration": duration},
@@ -85,17 +237,16 @@ class Renderer:
                 "y": 0,
                 "steps": [
                     {
-                        "args": [[f.name], frame_args(0)],
+                        "args": [[name], frame_args(0)],
                         "label": str(k),
                         "method": "animate",
                     }
-                    for k, f in enumerate(self.fig.frames)
+                    for k, name in enumerate(frame_names)
                 ],
             }
         ]
 
-        # Add animation controls to the existing layout
-        self.fig.update_layout(
+        return dict(
             title="Animated 3D Cellular Automaton in Plotly",
             updatemenus = [
                 {
@@ -122,13 +273,18 @@ class Renderer:
             sliders=sliders,
         )
 
-        self.fig.update_traces(showscale=False)
-
-        return self.fig
-    
     def render_grid(self):
+        if "terrain" in self.static_layers and self.terrain_mesh is not None:
+            return self.terrain_mesh, self.render_entities()
+
+        if self.meshing in ("vectorized", "greedy"):
+            return self.render_grid_vectorized()
+
+        grid = self.grid
+        if isinstance(grid, ArrayGrid):
+            grid = grid.materialize()
 
-        entity_meshes = []
+        entity_positions = []
 
         hover_texts = []
         cube_index = 0
@@ -145,19 +301,35 @@ class Renderer:
         self.n_vertices = 0
         self.n_faces = 0
 
-        for x, y, z in np.argwhere(self.grid != None):
-            cell = self.grid[x, y, z]
+        instrumentation = self.instrumentation
+        # Per-cell timings, only taken when instrumented
+        timed = instrumentation.enabled
+        cells = np.argwhere(grid != None)
+        cubes = 0
+        instrumentation.count("mesh/voxels_visited", len(cells))
+
+        for x, y, z in cells:
+            cell = grid[x, y, z]
 
             if Entity.is_terrain(cell.type):
                 terrain = cell
+                cubes += 1
 
-                exposed_faces = self.check_neighbors(terrain)
+                if timed:
+                    start = time.perf_counter()
+                exposed_faces = self.check_neighbors(terrain, grid)
+                if timed:
+                    instrumentation.add_time("mesh/check_neighbors", time.perf_counter() - start)
 
                 if not any(exposed_faces):
                     continue  # Skip fully hidden cubes
 
                 # Can be improved further by filtering on the global vertices instead of locally
+                if timed:
+                    start = time.perf_counter()
                 new_vertices, new_faces, new_colors = self.filter_visible_faces(terrain, exposed_faces)
+                if timed:
+                    instrumentation.add_time("mesh/filter_visible_faces", time.perf_counter() - start)
 
                 num_new_vertices = len(new_vertices)
                 num_new_faces = len(new_faces)
@@ -176,47 +348,318 @@ class Renderer:
                 cube_index += 1
 
             else:
-                entity = cell
-
-                vertices, faces, vertex_colors = entity.render()
-                entity_meshes.append(
-                    go.Mesh3d(
-                        x=vertices[:, 0], 
-                        y=vertices[:, 1], 
-                        z=vertices[:, 2],
-                        i=faces[:, 0], 
-                        j=faces[:, 1],
-                        k=faces[:, 2],
-                        vertexcolor=vertex_colors,
-                    )
-                )
+                entity_positions.append((x, y, z))
 
         # Trim excess memory
         self.terrain_vertices = self.terrain_vertices[:self.n_vertices]
         self.terrain_faces = self.terrain_faces[:self.n_faces]
         self.intensity_values = self.intensity_values[:self.n_faces]
 
-        # Get unique vertices without reordering
-        unique_vertices, unique_indices = np.unique(self.terrain_vertices, axis=0, return_inverse=True)
-        updated_faces = unique_indices[self.terrain_faces]
+        # 12 triangles per cube
+        instrumentation.count("mesh/triangles_culled", 12 * cubes - self.n_faces)
+
+        self.deduplicate_vertices()
+
+        terrain_mesh = self.update_terrain_mesh(hover_texts)
+        return terrain_mesh, self.create_entity_meshes(entity_positions, grid)
+
+    def render_grid_vectorized(self):
+        """
+        Same meshes as render_grid, but the exposed faces of all the terrain voxels
+        are computed at once from the "is terrain" occupancy array.
+
+        With a ChunkTracker, only the dirty chunks are meshed again and the cached
+        arrays of the other chunks are reused.
+        """
+        if self.chunks is None:
+            self.chunk_meshes = {
+                (0, 0): self.mesh_region(0, self.grid_size[0], 0, self.grid_size[1])
+            }
+        else:
+            dirty = self.chunks.take_dirty()
+            self.mesh_chunks(dirty)
+
+            if len(dirty) == 0 and self.terrain_mesh is not None:
+                # Nothing changed since the last frame
+                return self.terrain_mesh, self.chunk_entity_meshes()
+
+        vertices, faces, intensities, _ = zip(*self.chunk_meshes.values())
+        # The faces of each chunk index its vertices, shifted by the vertices of the chunks before
+        n_vertices = np.array([len(chunk) for chunk in vertices])
+        n_faces = np.array([len(chunk) for chunk in faces])
+        shifts = np.repeat(np.cumsum(n_vertices) - n_vertices, n_faces)
+
+        self.terrain_vertices = np.concatenate(vertices)
+        self.terrain_faces = np.concatenate(faces) + shifts[:, None]
+        self.intensity_values = np.concatenate(intensities)
+        self.n_vertices = len(self.terrain_vertices)
+        self.n_faces = len(self.terrain_faces)
+
+        self.deduplicate_vertices()
+
+        terrain_mesh = self.update_terrain_mesh()
+        return terrain_mesh, self.chunk_entity_meshes()
+
+    def mesh_chunks(self, chunks):
+        """
+        Mesh the given (cx, cy) chunks into self.chunk_meshes. When they fill most
+        of their bounding box (e.g. the first frame), the box is meshed in a single
+        pass and split into chunks, instead of one pass per chunk.
+        """
+        if len(chunks) == 0:
+            return
+
+        (cx0, cy0), (cx1, cy1) = chunks.min(axis=0), chunks.max(axis=0)
+        if len(chunks) == 1 or 2 * len(chunks) < (cx1 - cx0 + 1) * (cy1 - cy0 + 1):
+            for cx, cy in chunks:
+                self.chunk_meshes[(cx, cy)] = self.mesh_region(*self.chunks.bounds(cx, cy))
+            return
+
+        x0, _, y0, _ = self.chunks.bounds(cx0, cy0)
+        _, x1, _, y1 = self.chunks.bounds(cx1, cy1)
+        for (cx, cy), mesh in self.mesh_region(x0, x1, y0, y1, self.chunks.chunk_size).items():
+            self.chunk_meshes[(cx0 + cx, cy0 + cy)] = mesh
+
+    def chunk_entity_meshes(self):
+        positions = np.concatenate([chunk[3] for chunk in self.chunk_meshes.values()])
+        return self.create_entity_meshes(positions)
+
+    def render_entities(self):
+        """Render the non-terrain cells only."""
+        types, _ = grid_arrays(self.grid)
+        return self.create_entity_meshes(np.argwhere((types != 0) & ~TERRAIN_LUT[types]))
+
+    def update_terrain_mesh(self, hover_texts=None):
+        """
+        Create the terrain mesh from the current terrain arrays, or return the
+        previous one when they did not change so that frames share the trace.
+        """
+        arrays = (self.terrain_vertices, self.terrain_faces, self.intensity_values)
+        if self.terrain_mesh is not None and self.terrain_arrays is not None and all(
+            np.array_equal(new, old) for new, old in zip(arrays, self.terrain_arrays)
+        ):
+            return self.terrain_mesh
+
+        self.terrain_arrays = arrays
+        return self.create_terrain_mesh(hover_texts)
+
+    def deduplicate_vertices(self):
+        """Merge the duplicated terrain vertices shared by neighboring faces."""
+        with self.instrumentation.phase("mesh/deduplicate"):
+            self._deduplicate_vertices()
+
+        self.instrumentation.count("mesh/vertices_before_dedup", self.n_vertices)
+        self.instrumentation.count("mesh/vertices_after_dedup", len(self.terrain_vertices))
+
+    def _deduplicate_vertices(self):
+        vertices = self.terrain_vertices
+        if np.issubdtype(vertices.dtype, np.integer) or np.array_equal(vertices, np.round(vertices)):
+            # Box corners always lie on the integer lattice
+            unique_vertices, updated_faces = deduplicate_lattice_vertices(
+                self.terrain_vertices, self.terrain_faces, self.grid_size
+            )
+            unique_vertices = unique_vertices.astype(np.float32)
+        else:
+            unique_vertices, unique_indices = np.unique(self.terrain_vertices, axis=0, return_inverse=True)
+            updated_faces = unique_indices.reshape(-1)[self.terrain_faces]
 
         self.terrain_vertices = unique_vertices
         self.terrain_faces = updated_faces
 
-        terrain_mesh = self.create_terrain_mesh(hover_texts)
-        return terrain_mesh, entity_meshes
+    def mesh_region(self, x0, x1, y0, y1, chunk_size=None):
+        """
+        Mesh the terrain of the [x0, x1) x [y0, y1) columns of the grid.
+
+        :param chunk_size: Optionally split the result into the chunk_size x chunk_size
+            columns of the region, starting from (x0, y0).
+        :return: The vertices, faces and intensities of the region and the
+            positions of its non-terrain cells. With chunk_size, a dict of these
+            for each (cx, cy) chunk of the region, relative to the region.
+        """
+        # One cell of margin to see the neighbors across the region borders
+        mx0, mx1 = max(x0 - 1, 0), min(x1 + 1, self.grid_size[0])
+        my0, my1 = max(y0 - 1, 0), min(y1 + 1, self.grid_size[1])
+
+        with self.instrumentation.phase("mesh/region"):
+            types, states = self.grid_block(mx0, mx1, my0, my1)
+            solid = TERRAIN_LUT[types]
+            masks = exposed_faces(solid)
+            keys, color_table = self.terrain_color_table(types, states, solid, offset=(mx0, my0, 0))
+
+            inner = (slice(x0 - mx0, x1 - mx0), slice(y0 - my0, y1 - my0))
+            regions = None
+            if chunk_size is not None:
+                counts = (-(-(x1 - x0) // chunk_size), -(-(y1 - y0) // chunk_size))
+                cx = np.arange(x1 - x0) // chunk_size
+                cy = np.arange(y1 - y0) // chunk_size
+                regions = np.broadcast_to((cx[:, None] * counts[1] + cy[None, :])[:, :, None], solid[inner].shape)
+            mesh = mesh_terrain(
+                solid[inner], keys[inner], color_table,
+                masks=masks[(slice(None),) + inner],
+                greedy=self.meshing == "greedy",
+                regions=regions,
+            )
+            vertices, faces, intensities = mesh[:3]
+
+        if self.instrumentation.enabled:
+            self.instrumentation.count("mesh/voxels_visited", solid[inner].size)
+            # 12 triangles per cube, the hidden faces and the greedy merges emit less
+            self.instrumentation.count("mesh/triangles_culled", 12 * int(np.count_nonzero(solid[inner])) - len(faces))
+
+        offset = np.array([x0, y0, 0])
+        entities = np.argwhere((types[inner] != 0) & ~solid[inner]) + offset
+
+        if chunk_size is None:
+            return vertices + offset, faces, intensities, entities
+
+        quads = split_quads(vertices + offset, faces, intensities, mesh[3])
+        empty = (np.empty((0, 3), dtype=vertices.dtype), np.empty((0, 3), dtype=faces.dtype), np.empty(0, dtype=intensities.dtype))
+
+        # Entities grouped by chunk, in their order
+        entity_regions = regions[tuple((entities - offset).T)]
+        order = np.argsort(entity_regions, kind="stable")
+        entities = entities[order]
+        starts = np.searchsorted(entity_regions[order], np.arange(counts[0] * counts[1] + 1))
+
+        chunks = {}
+        for cx in range(counts[0]):
+            for cy in range(counts[1]):
+                region = cx * counts[1] + cy
+                chunks[(cx, cy)] = quads.get(region, empty) + (entities[starts[region]:starts[region + 1]],)
+        return chunks
+
+    def grid_block(self, x0, x1, y0, y1):
+        """Return the (types, states) arrays of the [x0, x1) x [y0, y1) columns."""
+        if isinstance(self.grid, ArrayGrid):
+            return self.grid.types[x0:x1, y0:y1], self.grid.states[x0:x1, y0:y1]
+        return object_grid_arrays(self.grid[x0:x1, y0:y1])
+
+    def get_cell(self, x, y, z):
+        if isinstance(self.grid, ArrayGrid):
+            return self.grid.get_cell(x, y, z)
+        return self.grid[x, y, z]
+
+    def terrain_color_table(self, types, states, solid, offset=(0, 0, 0)):
+        """
+        Build the per-voxel keys and the (key -> triangle intensities) table of the terrain.
+        The intensities of a (type, state) pair are taken once from a cell of the grid.
+
+        :param offset: Position in the grid of the first voxel of the given arrays.
+        """
+        def get_colors(entity, state, position):
+            if (entity, state) not in self.terrain_colors:
+                x, y, z = position + offset
+                _, _, colors = self.get_cell(x, y, z).render()
+                self.terrain_colors[(entity, state)] = np.asarray(colors)
+            return self.terrain_colors[(entity, state)]
+
+        return terrain_color_table(types, states, solid, get_colors)
 
+    def create_entity_meshes(self, positions, grid=None):
+        """
+        Batch the non-terrain cells in one mesh per entity type.
 
-    def check_neighbors(self, cell: Cell):
+        :param positions: The (x, y, z) positions of the non-terrain cells.
+        :param grid: The object grid holding them, defaults to the renderer grid.
+        :return: One trace per entity type seen so far, in order of appearance.
+        """
+        def get_cell(x, y, z):
+            return self.get_cell(x, y, z) if grid is None else grid[x, y, z]
+
+        positions = np.asarray(positions, dtype=np.intp).reshape(-1, 3)
+        if grid is None and isinstance(self.grid, ArrayGrid):
+            types = self.grid.types[tuple(positions.T)]
+        else:
+            source = self.grid if grid is None else grid
+            types = np.array([source[x, y, z].type for x, y, z in positions.tolist()], dtype=np.uint8)
+
+        # Entity types in order of appearance
+        entities, first = np.unique(types, return_index=True)
+        groups = {}
+        for entity in entities[np.argsort(first)].tolist():
+            group = positions[types == entity]
+            cell = get_cell(*group[0])
+            if cell is None:
+                continue  # Type without Cell class, not drawn
+            groups[entity] = (cell, group)
+
+        for entity in groups:
+            if entity not in self.entity_layers:
+                self.entity_layers.append(entity)
+
+        return [
+            self.create_batched_mesh(entity, *groups[entity], get_cell) if entity in groups else self.empty_trace
+            for entity in self.entity_layers
+        ]
+
+    def create_batched_mesh(self, entity, cell, positions, get_cell):
+        """
+        Create a single mesh for all the cells of one entity type.
+
+        :param cell: One of the cells, giving the geometry shared by all of them.
+        :param positions: The (n, 3) positions of the cells.
+        :param get_cell: Function of (x, y, z) returning a cell, only called when
+            the cells have no shared geometry and render themselves.
+        """
+        geometry = cell.instance_geometry()
+
+        if geometry is None:
+            # Batch the meshes rendered by each cell
+            rendered = [get_cell(x, y, z).render() for x, y, z in positions.tolist()]
+            offsets = np.cumsum([0] + [len(vertices) for vertices, _, _ in rendered[:-1]])
+
+            vertices = np.concatenate([vertices for vertices, _, _ in rendered])
+            faces = np.concatenate([faces + offset for (_, faces, _), offset in zip(rendered, offsets)])
+            vertex_colors = None
+            if all(colors is not None for _, _, colors in rendered):
+                vertex_colors = np.concatenate([colors for _, _, colors in rendered])
+
+            return self.create_mesh(vertices, faces, vertex_colors)
+
+        # Same instances as in the previous frame, keep the same trace
+        previous = self.entity_traces.get(entity)
+        if previous is not None and np.array_equal(previous[0], positions):
+            return previous[1]
+
+        local_vertices, local_faces, local_colors = geometry
+        count = len(positions)
+
+        vertices = (local_vertices[None, :, :] + positions[:, None, :]).reshape(-1, 3)
+        faces = (local_faces[None, :, :] + (len(local_vertices) * np.arange(count))[:, None, None]).reshape(-1, 3)
+        vertex_colors = None
+        if local_colors is not None:
+            vertex_colors = np.tile(local_colors, (count, 1))
+
+        mesh = self.create_mesh(vertices, faces, vertex_colors)
+        self.entity_traces[entity] = (positions, mesh)
+        return mesh
+
+    def create_mesh(self, vertices, faces, vertex_colors=None):
+        self.instrumentation.count("mesh/traces_created")
+        with self.instrumentation.phase("mesh/mesh3d"):
+            return go.Mesh3d(
+                x=vertices[:, 0], 
+                y=vertices[:, 1], 
+                z=vertices[:, 2],
+                i=faces[:, 0], 
+                j=faces[:, 1],
+                k=faces[:, 2],
+                vertexcolor=vertex_colors,
+            )
+
+
+    def check_neighbors(self, cell: Cell, grid=None):
         """Check which faces of the cube are exposed."""
+        if grid is None:
+            grid = self.grid
         x, y, z = cell.x, cell.y, cell.z  # Cube position
         max_x, max_y, max_z = self.grid_size # Grid bounds
 
-        neighbor_up = self.grid[x][y][z + 1] if z != max_z - 1 else None
-        neighbor_left = self.grid[x - 1][y][z] if x != 0 else None
-        neighbor_right = self.grid[x + 1][y][z] if x != max_x - 1 else None
-        neighbor_down = self.grid[x][y - 1][z] if y != 0 else None
-        neighbor_upward = self.grid[x][y + 1][z] if y != max_y - 1 else None
+        neighbor_up = grid[x][y][z + 1] if z != max_z - 1 else None
+        neighbor_left = grid[x - 1][y][z] if x != 0 else None
+        neighbor_right = grid[x + 1][y][z] if x != max_x - 1 else None
+        neighbor_down = grid[x][y - 1][z] if y != 0 else None
+        neighbor_upward = grid[x][y + 1][z] if y != max_y - 1 else None
 
         return [
             False,  # No need for bottom faces
@@ -314,24 +757,26 @@ class Renderer:
         # example : i = 4 -> color = (4 - 0) / (20 - 0) = 0.2
         
         # Create the Mesh3d trace
-        mesh = go.Mesh3d(
-            x=self.terrain_vertices[:, 0],
-            y=self.terrain_vertices[:, 1],
-            z=self.terrain_vertices[:, 2],
-            i=self.terrain_faces[:, 0],
-            j=self.terrain_faces[:, 1],
-            k=self.terrain_faces[:, 2],
-            intensity=np.concatenate((self.intensity_values, [0, 20])), # set min/max range
-            intensitymode='cell',
-            colorscale=custom_colorscale,  # Custom colors
-            hovertext=hover_texts,
-            hoverinfo="text+x+y+z",
-            # opacity=1.0,
-            flatshading=True,
-            lighting={
-                "vertexnormalsepsilon": 0,
-                "facenormalsepsilon": 0
-            },
-        )
+        self.instrumentation.count("mesh/traces_created")
+        with self.instrumentation.phase("mesh/mesh3d"):
+            mesh = go.Mesh3d(
+                x=self.terrain_vertices[:, 0],
+                y=self.terrain_vertices[:, 1],
+                z=self.terrain_vertices[:, 2],
+                i=self.terrain_faces[:, 0],
+                j=self.terrain_faces[:, 1],
+                k=self.terrain_faces[:, 2],
+                intensity=np.concatenate((self.intensity_values, [0, 20])), # set min/max range
+                intensitymode='cell',
+                colorscale=custom_colorscale,  # Custom colors
+                hovertext=hover_texts,
+                hoverinfo="text+x+y+z",
+                # opacity=1.0,
+                flatshading=True,
+                lighting={
+                    "vertexnormalsepsilon": 0,
+                    "facenormalsepsilon": 0
+                },
+            )
 
         return mesh
@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from pca.instrumentation import NULL_INSTRUMENTATION
+
+# Placeholder of the frames array in the HTML template
+FRAMES_MARKER = "PCA_FRAMES"
+
+# Padding of the layers absent from a frame
+EMPTY_TRACE = {"type": "mesh3d", "showscale": False}
+
+class FigureWriter:
+    def __init__(self, path, format=None, include_plotlyjs=True, auto_play=False, animation_opts=None, instrumentation=None):
+        """
+        Writes an animated figure to an HTML or JSON file frame by frame, so that
+        only the current frame is kept in memory instead of the whole animation.
+
+        Frames are appended to a temporary file as they are produced, a trace being
+        only serialized when it is a new object since the previous frame. close
+        then writes the output, dropping the traces that never changed from the
+        frames like Renderer.render does.
+
+        :param path: The output file.
+        :param format: "html" or "json", guessed from the file suffix by default.
+        :param include_plotlyjs: Forwarded to plotly.io.to_html for the HTML output.
+        :param auto_play: Start the animation when the HTML page is loaded.
+        :param animation_opts: Plotly.animate options used when auto_play is set.
+        :param instrumentation: Optional Instrumentation recording the serialization time.
+        """
+        self.path = Path(path)
+        self.format = format or self.path.suffix.lstrip(".").lower()
+        if self.format not in ("html", "json"):
+            raise ValueError(f"Unknown figure format {self.format}")
+
+        self.include_plotlyjs = include_plotlyjs
+        self.auto_play = auto_play
+        self.animation_opts = animation_opts or {}
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+
+        self.frame_names = []
+        # Trace objects of the previous frame, to only serialize the new ones
+        self.previous = []
+        # Indices of the traces changing between frames
+        self.dynamic = set()
+        self.n_traces = 0
+
+        self.tmp_file = tempfile.NamedTemporaryFile(
+            "w", suffix=".jsonl", dir=self.path.parent, delete=False
+        )
+
+    def add_frame(self, name, data):
+        """
+        Append a frame.
+
+        :param name: The frame name.
+        :param data: The traces of the frame, a trace at the same index as in the
+            previous frame being the same layer.
+        """
+        entries = []
+        with self.instrumentation.phase("write/serialize"):
+            for i, trace in enumerate(data):
+                if i < len(self.previous) and trace is self.previous[i]:
+                    # Same as in the previous frame
+                    entries.append("null")
+                else:
+                    entries.append(self.trace_json(trace))
+                    self.instrumentation.count("write/traces_serialized")
+                    if self.frame_names:
+                        self.dynamic.add(i)
+
+        # Layers missing from this frame are emptied
+        if self.frame_names:
+            self.dynamic.update(range(len(data), len(self.previous)))
+
+        self.tmp_file.write(f'{{"name": {json.dumps(name)}, "data": [{", ".join(entries)}]}}\n')
+        self.frame_names.append(name)
+        self.n_traces = max(self.n_traces, len(data))
+        self.previous = list(data)
+
+    def trace_json(self, trace):
+        # The figure export sends the typed arrays as base64, like Figure.to_json
+        plotly_json = go.Figure(data=[trace]).to_plotly_json()["data"][0]
+        plotly_json.setdefault("showscale", False)
+        return pio.to_json(plotly_json, validate=False)
+
+    def frames(self):
+        """Read back the frames from the temporary file, one at a time."""
+        dynamic = sorted(self.dynamic)
+        self.tmp_file.seek(0)
+
+        current = []
+        for line in self.tmp_file:
+            frame = json.loads(line)
+            data = frame["data"]
+            current = [
+                current[i] if trace is None else trace
+                for i, trace in enumerate(data)
+            ] + [EMPTY_TRACE] * (self.n_traces - len(data))
+
+            yield {
+                "name": frame["name"],
+                "data": [current[i] for i in dynamic],
+                "traces": dynamic,
+            }
+
+    def close(self, layout):
+        """
+        Write the output file and remove the temporary one.
+
+        :param layout: The figure layout (dict or go.Layout), with the animation controls.
+        """
+        tmp_path = self.tmp_file.name
+        self.tmp_file.close()
+        self.tmp_file = open(tmp_path, "r")
+
+        try:
+            # The base figure holds the traces of the first frame
+            base_data = []
+            if self.frame_names:
+                base_data = json.loads(self.tmp_file.readline())["data"]
+            base_data += [EMPTY_TRACE] * (self.n_traces - len(base_data))
+
+            if not isinstance(layout, dict):
+                layout = layout.to_plotly_json()
+
+            with open(self.path, "w") as output, self.instrumentation.phase(f"write/{self.format}"):
+                if self.format == "json":
+                    self.write_json(output, base_data, layout)
+                else:
+                    self.write_html(output, base_data, layout)
+        finally:
+            self.tmp_file.close()
+            os.remove(tmp_path)
+
+    def write_frames(self, output):
+        output.write("[")
+        for k, frame in enumerate(self.frames()):
+            if k:
+                output.write(",\n")
+            output.write(json.dumps(frame))
+        output.write("]")
+
+    def write_json(self, output, base_data, layout):
+        output.write(f'{{"data": {json.dumps(base_data)}, "layout": {pio.to_json(layout, validate=False)}, "frames": ')
+        self.write_frames(output)
+        output.write("}")
+
+    def write_html(self, output, base_data, layout):
+        post_script = f"Plotly.addFrames('{{plot_id}}', {FRAMES_MARKER})"
+        if self.auto_play:
+            post_script += f".then(function(){{ Plotly.animate('{{plot_id}}', null, {json.dumps(self.animation_opts)}); }})"
+        post_script += ";"
+
+        html = pio.to_html(
+            {"data": base_data, "layout": layout},
+            include_plotlyjs=self.include_plotlyjs,
+            post_script=post_script,
+            validate=False,
+        )
+        head, tail = html.split(FRAMES_MARKER, 1)
+
+        output.write(head)
+        self.write_frames(output)
+        output.write(tail)
@@ -0,0 +1,157 @@
+import numpy as np
+from pca.engines.engine import Engine
+from pca.enum import Entity
+
+# Moves of Rabbit.step: x - 1, x + 1, y - 1, y + 1, z - 1, z + 1
+FACE_MOVES = np.array([
+    (-1, 0, 0), (1, 0, 0),
+    (0, -1, 0), (0, 1, 0),
+    (0, 0, -1), (0, 0, 1),
+])
+
+class AgentStore:
+    def __init__(self, positions=None):
+        """
+        Positions and attributes of mobile agents kept in NumPy arrays, one row per agent.
+        The index of an agent is its priority when several agents want the same cell.
+
+        :param positions: The initial (n, 3) integer positions of the agents.
+        """
+        self.positions = np.empty((0, 3), dtype=np.intp)
+        # Per-agent attributes, name -> array of length len(self)
+        self.attributes = {}
+        # name -> value given to the new agents
+        self.defaults = {}
+
+        if positions is not None:
+            self.add(positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add_attribute(self, name, dtype=np.float32, fill=0):
+        """Allocate a named per-agent attribute array (or return the existing one)."""
+        if name not in self.attributes:
+            self.attributes[name] = np.full(len(self), fill, dtype=dtype)
+            self.defaults[name] = fill
+        return self.attributes[name]
+
+    def add(self, positions, **values):
+        """
+        Append agents.
+
+        :param positions: The (n, 3) positions of the new agents.
+        :param values: Attribute values of the new agents, the defaults for the others.
+        """
+        positions = np.asarray(positions, dtype=np.intp).reshape(-1, 3)
+        for name, array in self.attributes.items():
+            new_values = np.broadcast_to(values.get(name, self.defaults[name]), len(positions))
+            self.attributes[name] = np.concatenate([array, new_values.astype(array.dtype)])
+        self.positions = np.concatenate([self.positions, positions])
+
+    def remove(self, mask):
+        """Remove the agents selected by a boolean mask, the others keep their order."""
+        keep = ~np.asarray(mask, dtype=bool)
+        self.positions = self.positions[keep]
+        for name in self.attributes:
+            self.attributes[name] = self.attributes[name][keep]
+
+    def sync(self, types, entity):
+        """
+        Match the agents with the cells of the given entity type: agents whose cell
+        no longer holds the entity are removed, cells without agent get a new one.
+        """
+        present = types == entity
+
+        inside = np.all((self.positions >= 0) & (self.positions < types.shape), axis=1)
+        alive = inside.copy()
+        alive[inside] = present[tuple(self.positions[inside].T)]
+        if not alive.all():
+            self.remove(~alive)
+
+        present[tuple(self.positions.T)] = False
+        if present.any():
+            self.add(np.argwhere(present))
+
+    def propose_moves(self, types, moves, rng):
+        """
+        Draw for every agent one of the moves leading to an empty cell.
+
+        :param types: The type array, 0 being an empty cell.
+        :param moves: The (m, 3) candidate moves.
+        :param rng: The numpy.random.Generator drawing the moves.
+        :return: The target positions and the mask of the agents having a valid move.
+        """
+        targets = self.positions[:, None, :] + moves[None, :, :]
+        valid = np.all((targets >= 0) & (targets < types.shape), axis=2)
+        valid[valid] = types[tuple(targets[valid].T)] == 0
+
+        counts = valid.sum(axis=1)
+        moving = counts > 0
+
+        # Uniform choice among the valid moves of each agent
+        choice = rng.integers(0, counts[moving])
+        chosen = np.argmax(np.cumsum(valid[moving], axis=1) > choice[:, None], axis=1)
+
+        proposed = self.positions.copy()
+        proposed[moving] = targets[moving, chosen]
+        return proposed, moving
+
+    def resolve_conflicts(self, targets, moving, shape):
+        """
+        Keep a single agent per target cell, the one with the lowest index.
+
+        :return: The mask of the agents allowed to move.
+        """
+        movers = np.flatnonzero(moving)
+        linear = np.ravel_multi_index(tuple(targets[movers].T), shape)
+        _, first = np.unique(linear, return_index=True)
+
+        allowed = np.zeros(len(self), dtype=bool)
+        allowed[movers[first]] = True
+        return allowed
+
+
+class AgentEngine(Engine):
+    """
+    Vectorized version of Rabbit.step for all the agents of an entity type at once.
+
+    Every agent draws one of the empty face neighbors of its cell, when two agents
+    want the same cell the one with the lowest index in the AgentStore moves and
+    the other stays. The agents are then moved on the arrays in bulk.
+    """
+
+    radius = 1
+    stochastic = True
+
+    def __init__(self, entity=Entity.RABBIT, rng=None, moves=FACE_MOVES):
+        """
+        :param entity: The entity type of the agents.
+        :param rng: The numpy.random.Generator drawing the moves (e.g. World.rng).
+        :param moves: The (m, 3) candidate moves of an agent.
+        """
+        self.entity = entity
+        self.entities = (entity,)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.moves = np.asarray(moves)
+        self.agents = AgentStore()
+
+    def advance(self, types, states):
+        agents = self.agents
+        agents.sync(types, self.entity)
+
+        targets, moving = agents.propose_moves(types, self.moves, self.rng)
+        allowed = agents.resolve_conflicts(targets, moving, types.shape)
+
+        new_types = types.copy()
+        new_states = states.copy()
+
+        old = tuple(agents.positions[allowed].T)
+        new = tuple(targets[allowed].T)
+        new_types[old] = 0
+        new_states[old] = 0
+        new_types[new] = self.entity
+        new_states[new] = states[old]
+
+        agents.positions[allowed] = targets[allowed]
+        return new_types, new_states
@@ -0,0 +1,30 @@
+from pca.engines.engine import Engine
+from pca.engines.kernels import count_neighbors, HORIZONTAL_MOORE
+from pca.enum import Entity
+
+class ConwayEngine(Engine):
+    """
+    Vectorized version of ConwayCell.step: neighbor counts are computed for
+    the whole grid at once and the rules are applied as boolean array ops.
+    """
+
+    entities = (Entity.CONWAY_CUBE,)
+    radius = 1
+
+    def advance(self, types, states):
+        # Any live cell counts as a neighbor, whatever its type (see ConwayCell.count_live_neighbors)
+        alive = states == 1
+        live_neighbors = count_neighbors(alive, HORIZONTAL_MOORE)
+
+        conway = types == Entity.CONWAY_CUBE
+
+        # Dies due to underpopulation or overpopulation
+        dies = conway & alive & ((live_neighbors < 2) | (live_neighbors > 3))
+        # Dead cell comes to life due to reproduction
+        born = conway & (states == 0) & (live_neighbors == 3)
+
+        new_states = states.copy()
+        new_states[dies] = 0
+        new_states[born] = 1
+
+        return types, new_states
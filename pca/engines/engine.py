@@ -0,0 +1,67 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+class Engine(ABC):
+    """
+    Base class for the whole-grid update rules.
+
+    An engine steps every cell of its entity types at once on the typed arrays
+    of an ArrayGrid, instead of calling Cell.step cell by cell. Like Cell.step,
+    it reads the previous generation from old_grid and writes into new_grid.
+    """
+
+    # Entity types stepped by this engine
+    entities = ()
+
+    # How far (in cells) the rule looks around a cell
+    radius = 1
+
+    # Whether cells can change without any change around them (random rules),
+    # such engines always step the whole grid
+    stochastic = False
+
+    @abstractmethod
+    def advance(self, types, states):
+        """
+        Compute the next generation of the given arrays, every engine implements it.
+
+        :param types: The uint8 entity type array of the current generation.
+        :param states: The state array of the current generation.
+        :return: The (types, states) arrays of the next generation.
+        """
+
+    def step(self, new_grid, old_grid, region=None):
+        """
+        Write the next generation of old_grid into new_grid, only touching the
+        cells that actually change.
+
+        :param region: Optional tuple of slices, the box holding all the cells that
+            may change. Only that box and radius cells around it are advanced.
+        :return: The boolean mask of the changed cells.
+        """
+        changed = np.zeros(old_grid.shape, dtype=bool)
+        if region is None:
+            region = tuple(slice(0, size) for size in old_grid.shape)
+
+        # The cells of the region see their neighbors up to radius cells away
+        block = tuple(
+            slice(max(box.start - self.radius, 0), min(box.stop + self.radius, size))
+            for box, size in zip(region, old_grid.shape)
+        )
+        inner = tuple(
+            slice(box.start - outer.start, box.stop - outer.start)
+            for box, outer in zip(region, block)
+        )
+
+        old_types, old_states = old_grid.types[block], old_grid.states[block]
+        types, states = self.advance(old_types, old_states)
+        types, states = types[inner], states[inner]
+        old_types, old_states = old_types[inner], old_states[inner]
+
+        region_changed = (types != old_types) | (states != old_states)
+        new_grid.types[region][region_changed] = types[region_changed]
+        new_grid.states[region][region_changed] = states[region_changed]
+        changed[region] = region_changed
+
+        return changed
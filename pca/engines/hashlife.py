@@ -0,0 +1,349 @@
+import warnings
+
+import numpy as np
+from pca.engines.engine import Engine
+from pca.enum import Entity
+
+# Nodes up to this level are turned into arrays once and pasted by to_array
+BLOCK_LEVEL = 4
+
+
+class Node:
+    """
+    Square block of 2^level x 2^level cells made of four blocks of the level below.
+    Nodes are shared: a HashLife holds a single node for each distinct content.
+    """
+
+    __slots__ = ("nw", "ne", "sw", "se", "level", "population")
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+
+
+class HashLife:
+    def __init__(self, alive=None, birth=(3,), survival=(2, 3), max_nodes=2_000_000):
+        """
+        Life-like 2D rule on an unbounded plane, stored as a quadtree of shared
+        nodes (macrocells) whose future is memoized, as in Gosper's Hashlife.
+
+        A node of level k knows its center 2^(k-1) block after up to 2^(k-2)
+        generations, computed once from its sub-blocks whatever the number of
+        places the same content appears in, so regular patterns can be advanced
+        by millions of generations.
+
+        The first array axis is the first coordinate (x), the origin being the
+        position of the [0, 0] cell of the loaded array.
+
+        :param alive: Optional 2D boolean array of the live cells to load.
+        :param birth: Live neighbor counts giving birth to a dead cell.
+        :param survival: Live neighbor counts keeping a live cell alive.
+        :param max_nodes: Size of the node table above which the memoized results are dropped.
+        """
+        self.birth = frozenset(birth)
+        self.survival = frozenset(survival)
+        self.max_nodes = max_nodes
+
+        self.dead = Node(None, None, None, None, 0, 0)
+        self.live = Node(None, None, None, None, 0, 1)
+
+        # (nw, ne, sw, se) -> Node
+        self.nodes = {}
+        # (node, j) -> center of node after 2^j generations
+        self.results = {}
+        # Node -> boolean array, for the nodes up to BLOCK_LEVEL
+        self.blocks = {}
+        # Empty node of each level
+        self.empties = [self.dead]
+
+        self.root = self.empty(2)
+        self.origin = (0, 0)
+        self.generation = 0
+
+        if alive is not None:
+            self.load(alive)
+
+    @property
+    def population(self):
+        return self.root.population
+
+    def join(self, nw, ne, sw, se):
+        """Return the node made of four nodes of the same level."""
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            population = nw.population + ne.population + sw.population + se.population
+            node = self.nodes[key] = Node(nw, ne, sw, se, nw.level + 1, population)
+        return node
+
+    def empty(self, level):
+        while len(self.empties) <= level:
+            empty = self.empties[-1]
+            self.empties.append(self.join(empty, empty, empty, empty))
+        return self.empties[level]
+
+    def load(self, alive, origin=(0, 0)):
+        """
+        Replace the pattern with a 2D boolean array, the memoized results being kept.
+
+        :param alive: The live cells.
+        :param origin: The position of the [0, 0] cell of the array.
+        """
+        alive = np.asarray(alive, dtype=bool)
+        level = max(2, int(np.ceil(np.log2(max(alive.shape + (1,))))))
+        size = 1 << level
+
+        padded = np.zeros((size, size), dtype=bool)
+        padded[:alive.shape[0], :alive.shape[1]] = alive
+
+        # Built bottom-up one level at a time, each distinct block once
+        ids = padded.astype(np.intp)
+        table = [self.dead, self.live]
+        for _ in range(level):
+            quads = np.stack(
+                [ids[0::2, 0::2], ids[0::2, 1::2], ids[1::2, 0::2], ids[1::2, 1::2]], axis=-1
+            ).reshape(-1, 4)
+            unique, inverse = np.unique(quads, axis=0, return_inverse=True)
+            table = [self.join(*(table[i] for i in row)) for row in unique.tolist()]
+            ids = inverse.reshape(ids.shape[0] // 2, ids.shape[1] // 2)
+
+        self.root = table[ids[0, 0]]
+        self.origin = tuple(origin)
+        self.generation = 0
+
+    def to_array(self, shape, origin=(0, 0)):
+        """
+        Return the live cells of a window of the plane as a 2D boolean array.
+
+        :param shape: The window size.
+        :param origin: The position of the [0, 0] cell of the window.
+        """
+        window = np.zeros(shape, dtype=bool)
+        wx, wy = origin
+        level = min(BLOCK_LEVEL, self.root.level)
+
+        # Nodes of the root meeting the window, down to the block level
+        layer = [(self.root, self.origin[0] - wx, self.origin[1] - wy)]
+        for node_level in range(self.root.level, level, -1):
+            half = 1 << (node_level - 1)
+            layer = [
+                (child, x + dx, y + dy)
+                for node, x, y in layer
+                for child, dx, dy in (
+                    (node.nw, 0, 0), (node.ne, 0, half), (node.sw, half, 0), (node.se, half, half),
+                )
+                if child.population
+                and x + dx < shape[0] and x + dx + half > 0
+                and y + dy < shape[1] and y + dy + half > 0
+            ]
+
+        for node, x, y in layer:
+            if not node.population:
+                continue
+            block = self.block_array(node)
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + len(block), shape[0]), min(y + len(block), shape[1])
+            if x0 < x1 and y0 < y1:
+                window[x0:x1, y0:y1] = block[x0 - x:x1 - x, y0 - y:y1 - y]
+
+        return window
+
+    def block_array(self, node):
+        if node.level == 0:
+            return np.array([[node.population == 1]])
+        block = self.blocks.get(node)
+        if block is None:
+            block = self.blocks[node] = np.block([
+                [self.block_array(node.nw), self.block_array(node.ne)],
+                [self.block_array(node.sw), self.block_array(node.se)],
+            ])
+        return block
+
+    def advance(self, generations):
+        """Advance the pattern by a number of generations, one power of two at a time."""
+        generations = int(generations)
+        if generations < 0:
+            raise ValueError("Cannot advance by a negative number of generations")
+
+        j = 0
+        while generations:
+            if generations & 1:
+                self.advance_pow2(j)
+            generations >>= 1
+            j += 1
+
+    def advance_pow2(self, j):
+        """Advance the pattern by 2^j generations."""
+        # Pad the root until the pattern cannot leave its center in 2^j generations
+        while self.root.level < j + 2 or not self.is_padded():
+            self.expand()
+        self.expand()
+
+        size = 1 << self.root.level
+        self.root = self.step(self.root, j)
+        self.origin = (self.origin[0] + size // 4, self.origin[1] + size // 4)
+        self.generation += 1 << j
+
+        if len(self.nodes) > self.max_nodes:
+            self.collect()
+
+    def is_padded(self):
+        """Whether all the live cells are in the center half of the root."""
+        root = self.root
+        return (
+            root.nw.population == root.nw.se.population
+            and root.ne.population == root.ne.sw.population
+            and root.sw.population == root.sw.ne.population
+            and root.se.population == root.se.nw.population
+        )
+
+    def expand(self):
+        """Surround the root with empty space, doubling its size."""
+        root = self.root
+        empty = self.empty(root.level - 1)
+        self.root = self.join(
+            self.join(empty, empty, empty, root.nw),
+            self.join(empty, empty, root.ne, empty),
+            self.join(empty, root.sw, empty, empty),
+            self.join(root.se, empty, empty, empty),
+        )
+        half = 1 << (root.level - 1)
+        self.origin = (self.origin[0] - half, self.origin[1] - half)
+
+    def center(self, node):
+        return self.join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def step(self, node, j):
+        """Return the center of a node (one level down) after 2^j generations, j <= level - 2."""
+        if node.population == 0:
+            return self.empty(node.level - 1)
+
+        key = (node, j)
+        result = self.results.get(key)
+        if result is not None:
+            return result
+
+        if node.level == 2:
+            result = self.step_base(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            # The nine overlapping sub-blocks of level - 1
+            grid = (
+                (nw, self.join(nw.ne, ne.nw, nw.se, ne.sw), ne),
+                (self.join(nw.sw, nw.se, sw.nw, sw.ne), self.center(node), self.join(ne.sw, ne.se, se.nw, se.ne)),
+                (sw, self.join(sw.ne, se.nw, sw.se, se.sw), se),
+            )
+
+            if j == node.level - 2:
+                # Full speed: both halves of the 2^j generations are memoized steps
+                first = [[self.step(sub, j - 1) for sub in row] for row in grid]
+                j = j - 1
+            else:
+                first = [[self.center(sub) for sub in row] for row in grid]
+
+            result = self.join(
+                self.step(self.join(first[0][0], first[0][1], first[1][0], first[1][1]), j),
+                self.step(self.join(first[0][1], first[0][2], first[1][1], first[1][2]), j),
+                self.step(self.join(first[1][0], first[1][1], first[2][0], first[2][1]), j),
+                self.step(self.join(first[1][1], first[1][2], first[2][1], first[2][2]), j),
+            )
+
+        self.results[key] = result
+        return result
+
+    def step_base(self, node):
+        """Center 2x2 cells of a 4x4 node after one generation."""
+        cells = self.block_array(node)
+        new = []
+        for x in (1, 2):
+            for y in (1, 2):
+                neighbors = int(cells[x - 1:x + 2, y - 1:y + 2].sum()) - int(cells[x, y])
+                alive = neighbors in (self.survival if cells[x, y] else self.birth)
+                new.append(self.live if alive else self.dead)
+        return self.join(*new)
+
+    def collect(self):
+        """Drop the memoized results and the nodes no longer used by the pattern."""
+        self.results = {}
+        self.blocks = {}
+        self.nodes = {}
+
+        stack = [self.root] + self.empties[1:]
+        while stack:
+            node = stack.pop()
+            key = (node.nw, node.ne, node.sw, node.se)
+            if node.level == 0 or key in self.nodes:
+                continue
+            self.nodes[key] = node
+            stack.extend(key)
+
+
+class HashLifeEngine(Engine):
+    """
+    Life-like rule of ConwayCell run by HashLife, for advancing the Conway
+    layers by a large number of generations at once (see World.leap).
+
+    Each z layer holding the entity is a separate plane, which must be fully
+    made of cells of the entity. HashLife simulates an unbounded plane: the
+    results are the ones of ConwayEngine as long as the patterns stay clear of
+    the world edges, the cells leaving the world are dropped with a warning.
+    The memoized results are kept between calls while the layers are not
+    modified by anything else.
+    """
+
+    radius = 1
+
+    def __init__(self, birth=(3,), survival=(2, 3), entity=Entity.CONWAY_CUBE):
+        """
+        :param birth: Live neighbor counts giving birth to a dead cell.
+        :param survival: Live neighbor counts keeping a live cell alive.
+        :param entity: The entity type of the cells, the state 1 being alive.
+        """
+        self.birth = birth
+        self.survival = survival
+        self.entity = entity
+        self.entities = (entity,)
+
+        # z -> HashLife of the layer, and the live cells it was last written to
+        self.universes = {}
+        self.layers = {}
+
+    def advance(self, types, states):
+        return self.leap(types, states, 1)
+
+    def leap(self, types, states, generations):
+        """
+        Advance the layers of the entity by a number of generations.
+
+        :return: The (types, states) arrays after the generations.
+        """
+        new_states = states.copy()
+
+        for z in range(types.shape[2]):
+            layer = types[:, :, z] == self.entity
+            if not layer.any():
+                continue
+            if not layer.all():
+                raise ValueError(f"Layer {z} mixes {self.entity.name} cells with other cells, HashLife needs full layers")
+
+            alive = states[:, :, z] == 1
+            universe = self.universes.get(z)
+            if universe is None:
+                universe = self.universes[z] = HashLife(birth=self.birth, survival=self.survival)
+            if z not in self.layers or not np.array_equal(self.layers[z], alive):
+                universe.load(alive)
+
+            universe.advance(generations)
+            alive = universe.to_array(alive.shape)
+            if np.count_nonzero(alive) != universe.population:
+                warnings.warn(f"Cells of layer {z} left the world during the leap and were dropped")
+                universe.load(alive)
+
+            new_states[:, :, z] = alive
+            self.layers[z] = alive
+
+        return types, new_states
@@ -0,0 +1,113 @@
+import numpy as np
+
+# Horizontal Moore neighborhood (no change in z-axis), as used by ConwayCell
+HORIZONTAL_MOORE = [
+    (-1, -1, 0), (-1, 0, 0), (-1, 1, 0),
+    (0, -1, 0),              (0, 1, 0),
+    (1, -1, 0),  (1, 0, 0),  (1, 1, 0),
+]
+
+
+def count_neighbors(mask, offsets):
+    """
+    Count, for every cell, how many of its neighbors are set in the mask.
+
+    Cells outside the grid count as unset, like the per-cell neighbor loops.
+
+    :param mask: A 3D boolean array.
+    :param offsets: The (dx, dy, dz) offsets making up the neighborhood.
+    :return: An integer array of the mask shape with the neighbor counts.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64).reshape(-1, 3)
+    pad = np.abs(offsets).max(axis=0) if len(offsets) else np.zeros(3, dtype=np.int64)
+
+    dtype = np.uint8 if len(offsets) < 256 else np.uint16
+    padded = np.pad(mask.astype(dtype), [(p, p) for p in pad])
+
+    counts = np.zeros(mask.shape, dtype=dtype)
+    size_x, size_y, size_z = mask.shape
+    for dx, dy, dz in offsets:
+        x0, y0, z0 = pad[0] + dx, pad[1] + dy, pad[2] + dz
+        counts += padded[x0:x0 + size_x, y0:y0 + size_y, z0:z0 + size_z]
+
+    return counts
+
+
+def neighborhood_offsets(neighborhood="moore", radius=1):
+    """
+    List the 3D offsets of a neighborhood, the cell itself excluded.
+
+    :param neighborhood: "moore" (cube of side 2 * radius + 1) or "von_neumann"
+        (cells within a Manhattan distance of radius).
+    :param radius: The range of the neighborhood.
+    """
+    span = range(-radius, radius + 1)
+    offsets = []
+    for dx in span:
+        for dy in span:
+            for dz in span:
+                if (dx, dy, dz) == (0, 0, 0):
+                    continue
+                match neighborhood:
+                    case "moore":
+                        offsets.append((dx, dy, dz))
+                    case "von_neumann":
+                        if abs(dx) + abs(dy) + abs(dz) <= radius:
+                            offsets.append((dx, dy, dz))
+                    case _:
+                        raise ValueError(f"Unknown neighborhood {neighborhood}")
+    return offsets
+
+
+def count_moore_neighbors(mask, radius=1):
+    """
+    Same result as count_neighbors over a 3D Moore neighborhood, computed as
+    separable box sums: 3 * (2 * radius + 1) additions instead of (2 * radius + 1) ** 3.
+    """
+    dtype = np.uint8 if (2 * radius + 1) ** 3 < 256 else np.uint16
+    counts = mask.astype(dtype)
+
+    for axis in range(3):
+        size = counts.shape[axis]
+        pad = [(0, 0)] * 3
+        pad[axis] = (radius, radius)
+        padded = np.pad(counts, pad)
+
+        summed = np.zeros_like(counts)
+        for shift in range(2 * radius + 1):
+            summed += np.take(padded, range(shift, shift + size), axis=axis)
+        counts = summed
+
+    return counts - mask.astype(dtype)
+
+
+def dilate(mask, radius=1):
+    """Grow a boolean mask by radius cells along every axis (a Moore neighborhood)."""
+    grown = mask.copy()
+    for axis in range(mask.ndim):
+        source = grown.copy()
+        for shift in range(1, radius + 1):
+            if shift >= mask.shape[axis]:
+                break
+            lower = [slice(None)] * mask.ndim
+            upper = [slice(None)] * mask.ndim
+            lower[axis] = slice(None, -shift)
+            upper[axis] = slice(shift, None)
+            grown[tuple(lower)] |= source[tuple(upper)]
+            grown[tuple(upper)] |= source[tuple(lower)]
+    return grown
+
+
+def bounding_box(mask, margin=0):
+    """
+    Slices of the smallest box holding the set cells of a mask, grown by margin
+    cells and clipped to the mask shape, or None when no cell is set.
+    """
+    if not mask.any():
+        return None
+    box = []
+    for axis in range(mask.ndim):
+        other_axes = tuple(a for a in range(mask.ndim) if a != axis)
+        indices = np.flatnonzero(mask.any(axis=other_axes))
+        box.append(slice(max(indices[0] - margin, 0), min(indices[-1] + margin + 1, mask.shape[axis])))
+    return tuple(box)
@@ -0,0 +1,52 @@
+import numpy as np
+from pca.engines.engine import Engine
+from pca.enum import Entity
+
+# MagicTerrain.step actions
+SHRINK, GROW, STAY = 0, 1, 2
+
+class MagicTerrainEngine(Engine):
+    """
+    Vectorized version of MagicTerrain.step: the actions of all the cells that
+    can grow or shrink are drawn in one call from a NumPy Generator, and applied
+    as boolean array ops. Runs are reproducible given the Generator seed.
+    """
+
+    entities = (Entity.MAGIC_TERRAIN,)
+    radius = 1
+    stochastic = True
+
+    def __init__(self, rng=None):
+        """
+        :param rng: The numpy.random.Generator drawing the actions (e.g. World.rng).
+        """
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def advance(self, types, states):
+        magic = types == Entity.MAGIC_TERRAIN
+
+        above_empty = np.zeros(types.shape, dtype=bool)
+        above_empty[:, :, :-1] = types[:, :, 1:] == 0
+        top_layer = np.zeros(types.shape, dtype=bool)
+        top_layer[:, :, -1] = True
+
+        # Only the cells with nothing above them can act, one action drawn for each
+        acting = magic & (above_empty | top_layer)
+        actions = np.full(types.shape, STAY, dtype=np.int8)
+        actions[acting] = self.rng.integers(0, 3, size=int(np.count_nonzero(acting)))
+
+        shrink = (actions == SHRINK)
+        shrink[:, :, 0] = False
+        grow = (actions == GROW) & above_empty
+
+        new_types = types.copy()
+        new_states = states.copy()
+
+        new_types[shrink] = 0
+        new_states[shrink] = 0
+
+        # The new cell on top is a copy of the one below
+        new_types[:, :, 1:][grow[:, :, :-1]] = Entity.MAGIC_TERRAIN
+        new_states[:, :, 1:][grow[:, :, :-1]] = states[:, :, :-1][grow[:, :, :-1]]
+
+        return new_types, new_states
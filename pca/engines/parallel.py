@@ -0,0 +1,219 @@
+import os
+import weakref
+
+import numpy as np
+
+from pca.engines.engine import Engine
+from pca.shared import attach_array, create_array, free, start_pool, worker
+
+
+def init_worker(engine, blocks):
+    """
+    :param blocks: The (name, shape, dtype) of the shared arrays: the types and
+        states of both buffers, then the changed mask.
+    """
+    worker["engine"] = engine
+    worker["memories"], arrays = zip(*(attach_array(*block) for block in blocks))
+    worker["buffers"] = (arrays[0:2], arrays[2:4])
+    worker["changed"] = arrays[4]
+
+
+def step_slab(task):
+    """
+    Advance the [x0, x1) slab from one shared buffer into the other, reading its
+    halo from the neighboring slabs.
+
+    :param task: (x0, x1, source, target, full) with the indices of the buffers.
+        Unless full is set, target already holds the cells of source and only
+        the cells that change are written, the others may have been written by
+        other rules of the same generation.
+    """
+    x0, x1, source, target, full = task
+    old_types, old_states = worker["buffers"][source]
+    new_types, new_states = worker["buffers"][target]
+    engine = worker["engine"]
+
+    # radius cells of halo on each side, the world edge is dead like in advance
+    h0 = max(x0 - engine.radius, 0)
+    h1 = min(x1 + engine.radius, old_types.shape[0])
+    types, states = engine.advance(old_types[h0:h1], old_states[h0:h1])
+    types, states = types[x0 - h0:x1 - h0], states[x0 - h0:x1 - h0]
+
+    changed = (types != old_types[x0:x1]) | (states != old_states[x0:x1])
+    worker["changed"][x0:x1] = changed
+    if full:
+        new_types[x0:x1] = types
+        new_states[x0:x1] = states
+    else:
+        new_types[x0:x1][changed] = types[changed]
+        new_states[x0:x1][changed] = states[changed]
+
+
+class ParallelEngine(Engine):
+    """
+    Runs another engine on several cores by splitting the grid into slabs along x.
+
+    The grid lives in two buffers of shared memory that the workers step in
+    place: each generation every worker reads its slab padded with `radius`
+    cells of the neighboring slabs (its halo) from one buffer and writes it
+    into the other, so that the result is exactly the one of the wrapped engine.
+    The workers also compare their slab with the previous generation, so this
+    process neither copies nor scans the grid between generations.
+
+    In World.evolve, step moves the arrays of the two ArrayGrids of the world
+    into the buffers once (see adopt), after which the world reads and edits
+    the shared arrays directly. leap keeps the grid in the buffers for many
+    generations and only copies it in and out once.
+
+    Call close (or use it as a context manager) to stop the workers, the grids
+    then get back arrays of their own.
+
+    Every worker gets its own copy of the wrapped engine, so only deterministic
+    engines can be split: a random engine would draw the same numbers in every
+    slab, and the state it keeps (e.g. the agents of AgentEngine) would be
+    duplicated across the workers.
+    """
+
+    def __init__(self, engine, processes=None):
+        """
+        :param engine: The Engine to run, it must be deterministic and picklable.
+        :param processes: The number of worker processes (and slabs), defaults to the number of cores.
+        """
+        if engine.stochastic:
+            raise ValueError(f"{type(engine).__name__} is stochastic, ParallelEngine can only split deterministic engines")
+
+        self.engine = engine
+        self.entities = engine.entities
+        self.radius = engine.radius
+        self.processes = processes
+
+        self.pool = None
+        self.shape = None
+        self.state_dtype = None
+        self.memories = []
+        # Two (types, states) pairs of shared arrays, and the changed mask of the last generation
+        self.buffers = []
+        self.changed = None
+        # Weak references to the grids whose arrays are the buffers, see adopt
+        self.owners = [None, None]
+        self.slabs = []
+
+    def start(self, shape, state_dtype):
+        """Allocate the shared arrays for a grid shape and start the workers."""
+        self.close()
+
+        self.shape = shape
+        self.state_dtype = np.dtype(state_dtype)
+        dtypes = [np.dtype(np.uint8), self.state_dtype] * 2 + [np.dtype(bool)]
+        self.memories, arrays = zip(*(create_array(shape, dtype) for dtype in dtypes))
+        self.buffers = [arrays[0:2], arrays[2:4]]
+        self.changed = arrays[4]
+
+        processes = self.processes or os.cpu_count()
+        blocks = [(memory.name, shape, dtype) for memory, dtype in zip(self.memories, dtypes)]
+        self.pool = start_pool(processes, init_worker, (self.engine, blocks))
+
+        # One slab per worker
+        n_slabs = min(processes, shape[0])
+        bounds = np.linspace(0, shape[0], n_slabs + 1).astype(int)
+        self.slabs = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def prepare(self, shape, state_dtype):
+        """Start the workers unless they already run on buffers of that shape and dtype."""
+        if self.pool is None or tuple(shape) != self.shape or np.dtype(state_dtype) != self.state_dtype:
+            self.start(tuple(shape), state_dtype)
+
+    def run_generation(self, source, target, full):
+        """Let the workers advance the grid from one buffer into the other, see step_slab."""
+        self.pool.map(step_slab, [(x0, x1, source, target, full) for x0, x1 in self.slabs])
+
+    def load(self, buffer, types, states):
+        """Copy arrays into a buffer, the grid using it gets its own arrays back."""
+        self.release(buffer)
+        self.buffers[buffer][0][...] = types
+        self.buffers[buffer][1][...] = states
+
+    def buffer_of(self, grid):
+        """Index of the buffer holding the arrays of an ArrayGrid, None when it has its own."""
+        for buffer, (types, states) in enumerate(self.buffers):
+            if grid.types is types and grid.states is states:
+                return buffer
+        return None
+
+    def adopt(self, grid, other):
+        """
+        Move the arrays of an ArrayGrid into a buffer (the one other does not
+        use), so that the workers step it in place. The grid keeps the shared
+        arrays as its own until close.
+
+        :return: The index of the buffer.
+        """
+        buffer = self.buffer_of(grid)
+        if buffer is not None:
+            return buffer
+
+        buffer = 1 if self.buffer_of(other) == 0 else 0
+        self.load(buffer, grid.types, grid.states)
+        grid.types, grid.states = self.buffers[buffer]
+        self.owners[buffer] = weakref.ref(grid)
+        return buffer
+
+    def release(self, buffer):
+        """Give the grid using a buffer a copy of its arrays."""
+        owner = self.owners[buffer] and self.owners[buffer]()
+        if owner is not None and self.buffer_of(owner) == buffer:
+            owner.types, owner.states = owner.types.copy(), owner.states.copy()
+        self.owners[buffer] = None
+
+    def step(self, new_grid, old_grid, region=None):
+        """
+        Same as Engine.step, the slabs covering the whole grid whatever the region.
+
+        :return: The changed mask, a shared array overwritten by the next step.
+        """
+        self.prepare(old_grid.shape, old_grid.states.dtype)
+        source = self.adopt(old_grid, new_grid)
+        target = self.adopt(new_grid, old_grid)
+        self.run_generation(source, target, full=False)
+        return self.changed
+
+    def advance(self, types, states):
+        return self.leap(types, states, 1)
+
+    def leap(self, types, states, generations):
+        """
+        Advance the arrays by a number of generations, the grid staying in the
+        shared buffers in between (see World.leap).
+
+        :return: The (types, states) arrays after the generations.
+        """
+        self.prepare(types.shape, states.dtype)
+        self.load(0, types, states)
+        self.release(1)
+        for generation in range(generations):
+            self.run_generation(generation % 2, 1 - generation % 2, full=True)
+        return tuple(array.copy() for array in self.buffers[generations % 2])
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+        for buffer in range(len(self.buffers)):
+            self.release(buffer)
+        self.buffers = []
+        self.changed = None
+        free(self.memories)
+        self.memories = []
+        self.shape = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"ParallelEngine({self.engine!r}, processes={self.processes})"
@@ -0,0 +1,122 @@
+import numpy as np
+from pca.engines.engine import Engine
+from pca.engines.kernels import count_neighbors, count_moore_neighbors, neighborhood_offsets
+from pca.enum import Entity
+
+class OuterTotalisticRule(Engine):
+    """
+    3D outer-totalistic rule (e.g. B5/S45) compiled to a vectorized kernel.
+
+    Empty voxels (and dead cells of the rule's entity) with a number of live
+    neighbors in `birth` become alive, live cells with a number of live
+    neighbors in `survival` stay alive. With more than 2 states, cells that do
+    not survive go through the decaying states 2 .. states - 1 before being
+    removed, like Generations rules.
+    """
+
+    def __init__(self, birth, survival, neighborhood="moore", radius=1, states=2, entity=Entity.RULE_CUBE):
+        """
+        :param birth: Neighbor counts giving birth to a cell.
+        :param survival: Neighbor counts keeping a live cell alive.
+        :param neighborhood: "moore" or "von_neumann".
+        :param radius: The range of the neighborhood.
+        :param states: Number of states, 2 for a plain life-like rule.
+        :param entity: The entity type stepped (and created) by the rule.
+        """
+        if states < 2:
+            raise ValueError("A rule needs at least 2 states")
+
+        self.birth = sorted(set(birth))
+        self.survival = sorted(set(survival))
+        self.neighborhood = neighborhood
+        self.radius = radius
+        self.states = states
+        self.entity = entity
+        self.entities = (entity,)
+
+        self.offsets = neighborhood_offsets(neighborhood, radius)
+
+        # Lookup tables indexed by the neighbor count
+        max_count = len(self.offsets)
+        self.birth_lut = np.zeros(max_count + 1, dtype=bool)
+        self.survival_lut = np.zeros(max_count + 1, dtype=bool)
+        for count in self.birth:
+            if 0 <= count <= max_count:
+                self.birth_lut[count] = True
+        for count in self.survival:
+            if 0 <= count <= max_count:
+                self.survival_lut[count] = True
+
+    @classmethod
+    def from_string(cls, rule, neighborhood="moore", radius=1, entity=Entity.RULE_CUBE):
+        """
+        Parse a rule written as "B5/S45", "B4-5/S5,6,7" or "B2/S/C3" (Generations
+        with 3 states). Without commas or ranges every digit is a separate count.
+        """
+        birth, survival, states = [], [], 2
+
+        for part in rule.upper().replace(" ", "").split("/"):
+            if not part:
+                continue
+            match part[0]:
+                case "B":
+                    birth = cls._parse_counts(part[1:])
+                case "S":
+                    survival = cls._parse_counts(part[1:])
+                case "C" | "G":
+                    states = int(part[1:])
+                case _:
+                    raise ValueError(f"Cannot parse rule {rule}")
+
+        return cls(birth, survival, neighborhood, radius, states, entity)
+
+    @staticmethod
+    def _parse_counts(text):
+        if not text:
+            return []
+        if "," not in text and "-" not in text:
+            return [int(digit) for digit in text]
+
+        counts = []
+        for item in text.split(","):
+            if "-" in item:
+                low, high = item.split("-")
+                counts.extend(range(int(low), int(high) + 1))
+            elif item:
+                counts.append(int(item))
+        return counts
+
+    def __repr__(self):
+        birth = ",".join(str(count) for count in self.birth)
+        survival = ",".join(str(count) for count in self.survival)
+        return f"B{birth}/S{survival}/C{self.states} ({self.neighborhood}, radius {self.radius})"
+
+    def count_live_neighbors(self, alive):
+        if self.neighborhood == "moore":
+            return count_moore_neighbors(alive, self.radius)
+        return count_neighbors(alive, self.offsets)
+
+    def advance(self, types, states):
+        own = types == self.entity
+        alive = own & (states == 1)
+        live_neighbors = self.count_live_neighbors(alive)
+
+        born = ((types == 0) | (own & (states == 0))) & self.birth_lut[live_neighbors]
+        fading = alive & ~self.survival_lut[live_neighbors]
+        decaying = own & (states >= 2)
+
+        new_types = types.copy()
+        new_states = states.copy()
+
+        new_states[decaying] += 1
+        new_states[fading] = 2
+
+        # Cells past their last decaying state are removed
+        dead = (fading | decaying) & (new_states >= self.states)
+        new_types[dead] = 0
+        new_states[dead] = 0
+
+        new_types[born] = self.entity
+        new_states[born] = 1
+
+        return new_types, new_states
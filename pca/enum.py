@@ -8,8 +8,17 @@ class Entity(IntEnum):
     CONWAY_CUBE = 3
     TREE = 4
     COLORFUL_TERRAIN = 5
+    RULE_CUBE = 6
     RABBIT = 10
 
+    @classmethod
+    def name_of(cls, entity):
+        """Name of an entity type, or its number for the types outside the enum."""
+        try:
+            return cls(entity).name
+        except ValueError:
+            return str(int(entity))
+
     @classmethod
     def is_terrain(cls, entity):
         """Method to check if the given value is TERRAIN."""
@@ -22,5 +31,7 @@ class Entity(IntEnum):
                 return True
             case Entity.CONWAY_CUBE:
                 return True
+            case Entity.RULE_CUBE:
+                return True
             case _:
                 return False
\ No newline at end of file
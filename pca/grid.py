@@ -0,0 +1,196 @@
+import numpy as np
+
+class ArrayGrid:
+    def __init__(self, shape, factory=None, state_dtype=np.int16):
+        """
+        Dense struct-of-arrays storage for the World grid.
+
+        Every voxel is described by its entity type (0 for an empty voxel) and
+        an integer state. Cell objects are only built on demand by the factory.
+
+        :param shape: The (max_x, max_y, max_z) size of the grid.
+        :param factory: Callable (entity, x, y, z, state) -> Cell used to materialize cells.
+        :param state_dtype: The NumPy dtype used for the state array.
+        """
+        self.shape = tuple(shape)
+        self.factory = factory
+
+        self.types = np.zeros(self.shape, dtype=np.uint8)
+        self.states = np.zeros(self.shape, dtype=state_dtype)
+
+        # Optional per-cell attributes, name -> array of the grid shape
+        self.attributes = {}
+
+    def add_attribute(self, name, dtype=np.float32, fill=0):
+        """Allocate a named per-cell attribute array (or return the existing one)."""
+        if name not in self.attributes:
+            self.attributes[name] = np.full(self.shape, fill, dtype=dtype)
+        return self.attributes[name]
+
+    def copy(self):
+        new_grid = ArrayGrid(self.shape, self.factory, self.states.dtype)
+        new_grid.types = self.types.copy()
+        new_grid.states = self.states.copy()
+        new_grid.attributes = {name: values.copy() for name, values in self.attributes.items()}
+        return new_grid
+
+    def copy_cells(self, source, index):
+        """Copy the cells at an index (boolean mask or (xs, ys, zs)) from another grid of the same shape."""
+        for name, values in source.attributes.items():
+            if name not in self.attributes:
+                self.attributes[name] = values.copy()
+        pairs = [(self.types, source.types), (self.states, source.states)] + [
+            (self.attributes[name], values) for name, values in source.attributes.items()
+        ]
+        for target, values in pairs:
+            copy_at(target, values, index)
+
+    @property
+    def nbytes(self):
+        return (
+            self.types.nbytes +
+            self.states.nbytes +
+            sum(values.nbytes for values in self.attributes.values())
+        )
+
+    def occupied(self):
+        """Boolean mask of the non-empty voxels."""
+        return self.types != 0
+
+    def count(self, entity):
+        """Number of voxels holding the given entity type."""
+        return int(np.count_nonzero(self.types == entity))
+
+    def get_cell(self, x, y, z):
+        """Materialize the Cell stored at (x, y, z), or None for an empty voxel."""
+        entity = self.types[x, y, z]
+        if entity == 0:
+            return None
+        return self.factory(int(entity), int(x), int(y), int(z), int(self.states[x, y, z]))
+
+    def set_cell(self, x, y, z, cell):
+        """Store the type and state of a Cell (None clears the voxel)."""
+        if cell is None:
+            self.types[x, y, z] = 0
+            self.states[x, y, z] = 0
+        else:
+            self.types[x, y, z] = cell.type
+            self.states[x, y, z] = cell.state
+
+    def materialize(self, mask=None):
+        """
+        Build an object ndarray of Cell instances equivalent to this grid.
+
+        :param mask: Only build the cells set in this boolean mask, the others are left to None.
+        """
+        grid = np.empty(self.shape, dtype=object)
+        occupied = self.types != 0
+        if mask is not None:
+            occupied &= mask
+        for x, y, z in np.argwhere(occupied):
+            grid[x, y, z] = self.get_cell(x, y, z)
+        return grid
+
+    def assign(self, object_grid, mask=None):
+        """
+        Overwrite the arrays with the content of an object ndarray of cells.
+
+        :param mask: Only overwrite the cells set in this boolean mask.
+        """
+        if mask is None:
+            types, states = object_grid_arrays(object_grid, self.states.dtype)
+            self.types[...] = types
+            self.states[...] = states
+            return
+        types, states = object_grid_arrays(object_grid[mask], self.states.dtype)
+        self.types[mask] = types
+        self.states[mask] = states
+
+    @classmethod
+    def from_objects(cls, object_grid, factory=None, state_dtype=np.int16):
+        grid = cls(object_grid.shape, factory, state_dtype)
+        grid.assign(object_grid)
+        return grid
+
+
+def copy_at(target, source, index):
+    """target[index] = source[index], index being a boolean mask or a tuple of coordinate arrays."""
+    if isinstance(index, np.ndarray):
+        # A plain copy of everything beats a masked one unless few cells are set
+        if np.count_nonzero(index) > index.size // 64:
+            np.copyto(target, source)
+            return
+        if target.flags.c_contiguous and source.flags.c_contiguous:
+            # Flat indices are much cheaper to find than (xs, ys, zs)
+            flat = np.flatnonzero(index)
+            target.reshape(-1)[flat] = source.reshape(-1)[flat]
+            return
+        index = np.nonzero(index)
+    target[index] = source[index]
+
+
+def object_grid_arrays(object_grid, state_dtype=np.int16):
+    """
+    Extract the (types, states) arrays of an object ndarray of cells.
+
+    :param object_grid: An ndarray of dtype object holding Cell instances or None.
+    :return: A uint8 type array and a state array of the grid shape.
+    """
+    types = np.zeros(object_grid.shape, dtype=np.uint8)
+    states = np.zeros(object_grid.shape, dtype=state_dtype)
+
+    mask = object_grid != None
+    cells = object_grid[mask]
+    types[mask] = [cell.type for cell in cells]
+    states[mask] = [cell.state for cell in cells]
+
+    return types, states
+
+
+def grid_arrays(grid):
+    """Return the (types, states) arrays of an ArrayGrid or of an object ndarray of cells."""
+    if isinstance(grid, ArrayGrid):
+        return grid.types, grid.states
+    return object_grid_arrays(grid)
+
+
+def cell_hashes(index, types, states):
+    """
+    64-bit hashes of cells (splitmix64 of their flat index, type and state), 0 for
+    the empty ones, so that the XOR of the hashes of the cells is a state hash
+    that can be updated with the changed cells only (see World.state_hash).
+
+    :param index: The flat indices of the cells in the grid.
+    :param types: Their types.
+    :param states: Their states.
+    """
+    types = np.asarray(types)
+    z = np.asarray(index, dtype=np.uint64) << np.uint64(24)
+    z |= types.astype(np.uint64) << np.uint64(16)
+    z |= np.asarray(states).astype(np.uint16)
+    z += np.uint64(0x9E3779B97F4A7C15)
+    # In place, the cells can be the whole grid
+    z ^= z >> np.uint64(30)
+    z *= np.uint64(0xBF58476D1CE4E5B9)
+    z ^= z >> np.uint64(27)
+    z *= np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    z[types == 0] = 0
+    return z
+
+
+def state_hash(types, states):
+    """Hash of a whole (types, states) pair of arrays, see cell_hashes."""
+    index = np.flatnonzero(types)
+    hashes = cell_hashes(index, types.reshape(-1)[index], states.reshape(-1)[index])
+    return int(np.bitwise_xor.reduce(hashes, initial=np.uint64(0)))
+
+
+def cell_values(grid, index):
+    """Return the types and states of the cells at flat indices of an ArrayGrid or object grid."""
+    if isinstance(grid, ArrayGrid):
+        return grid.types.reshape(-1)[index], grid.states.reshape(-1)[index]
+    cells = grid.reshape(-1)[index]
+    types = np.array([0 if cell is None else cell.type for cell in cells], dtype=np.uint8)
+    states = np.array([0 if cell is None else cell.state for cell in cells], dtype=np.int64)
+    return types, states
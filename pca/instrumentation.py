@@ -0,0 +1,126 @@
+import time
+from contextlib import nullcontext
+
+# Shared no-op context manager of the disabled phases
+NULL_PHASE = nullcontext()
+
+
+class Instrumentation:
+    """
+    Hooks called by World and Renderer to time their phases and count their work.
+
+    This base class does nothing, it is the default of the worlds and renderers
+    so that the hooks cost a method call when instrumentation is off. Loops over
+    cells also check `enabled` before taking their per-cell timings. See Profiler.
+    """
+
+    enabled = False
+
+    def phase(self, name):
+        """Context manager timing a phase, e.g. `with instrumentation.phase("evolve"):`."""
+        return NULL_PHASE
+
+    def add_time(self, name, seconds):
+        """Add time to a phase timed by the caller."""
+
+    def count(self, name, value=1):
+        """Add to a counter."""
+
+    def end_frame(self):
+        """Close the record of the current frame, called by World.generate_frame."""
+
+
+# Default of the worlds and renderers
+NULL_INSTRUMENTATION = Instrumentation()
+
+
+class Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add_time(self.name, time.perf_counter() - self.start)
+
+
+class Profiler(Instrumentation):
+    enabled = True
+
+    def __init__(self, callback=None):
+        """
+        Records the wall time of the phases and the counters, frame by frame.
+
+        A frame record holds everything since the previous frame, e.g. the evolve
+        calls and the meshing of the frame. Phases are named by their place,
+        like "evolve/engine/CONWAY_CUBE" or "mesh/deduplicate". Code outside the
+        package can time its own phases, e.g. `with profiler.phase("write_html"):`.
+
+        :param callback: Optional function called with each frame record when the frame ends.
+        """
+        self.callback = callback
+        self.frames = []
+        self.current = self.new_record()
+
+        # name -> [seconds, calls] and name -> value, over the whole run
+        self.phases = {}
+        self.counters = {}
+
+    def new_record(self):
+        return {"frame": len(self.frames), "phases": {}, "counters": {}}
+
+    def phase(self, name):
+        return Phase(self, name)
+
+    def add_time(self, name, seconds):
+        phases = self.current["phases"]
+        phases[name] = phases.get(name, 0.0) + seconds
+
+        total = self.phases.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+
+    def count(self, name, value=1):
+        counters = self.current["counters"]
+        counters[name] = counters.get(name, 0) + value
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def end_frame(self):
+        record = self.current
+        self.frames.append(record)
+        self.current = self.new_record()
+        if self.callback is not None:
+            self.callback(record)
+
+    def report(self):
+        """
+        Return the records as a dict: "frames" lists the per-frame records,
+        "totals" the time and number of calls of each phase and the counters
+        over the whole run (frame in progress included).
+        """
+        return {
+            "frames": list(self.frames),
+            "totals": {
+                "phases": {
+                    name: {"time": seconds, "calls": calls}
+                    for name, (seconds, calls) in self.phases.items()
+                },
+                "counters": dict(self.counters),
+            },
+        }
+
+    def summary(self):
+        """Text table of the totals, the slowest phases first."""
+        lines = [f"{'phase':<40} {'time (s)':>10} {'calls':>8}"]
+        for name, (seconds, calls) in sorted(self.phases.items(), key=lambda item: -item[1][0]):
+            lines.append(f"{name:<40} {seconds:>10.4f} {calls:>8}")
+        lines.append("")
+        lines.append(f"{'counter':<40} {'value':>10}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<40} {value:>10}")
+        return "\n".join(lines)
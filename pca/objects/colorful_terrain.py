@@ -1,14 +1,13 @@
-from pca.cell import Cell
+from pca.cell import Cell, read_only
 import numpy as np
 from pca.enum import Entity
 
 class ColorfulTerrain(Cell):
+    __slots__ = ()
 
     def __init__(self, state=0, x=0, y=0, z=0, model={}):
         super().__init__(Entity.COLORFUL_TERRAIN, state, x, y, z, model)
 
-        self.colors = ColorfulTerrain.get_colors()
-
     def render(self):
         return self.vertices, self.faces, self.colors
     
@@ -22,4 +21,7 @@ class ColorfulTerrain(Cell):
         intensity_values = np.repeat(face_colors, 2)
 
         return intensity_values
-    
\ No newline at end of file
+
+
+# Triangle intensities shared by all the cells
+ColorfulTerrain.colors = read_only(ColorfulTerrain.get_colors())
@@ -1,14 +1,19 @@
 import numpy as np
-from pca.cell import Cell
+from pca.cell import Cell, read_only
 from pca.enum import Entity
 import random
 
 class ConwayCell(Cell):
+    __slots__ = ()
 
     def __init__(self, state=0, x=0, y=0, z=0, model={}):
         super().__init__(Entity.CONWAY_CUBE, state, x, y, z, model)
         self.set_dead()
 
+    @property
+    def colors(self):
+        return ConwayCell.ALIVE_COLORS if self.state == 1 else ConwayCell.DEATH_COLORS
+
     def __copy__(self):
         new_cell = ConwayCell(state=self.state, x=self.x, y=self.y, z=self.z, model=self.model)
         return new_cell
@@ -17,12 +22,17 @@ class ConwayCell(Cell):
         # Render method for displaying the cell's face colors.
         return self.vertices, self.faces, self.colors
     
+    def update(self, new_state):
+        # Keep the face colors in sync with the state
+        if new_state == 1:
+            self.set_alive()
+        else:
+            self.set_dead()
+
     def set_alive(self):
-        self.colors = ConwayCell.get_alive_colors()
         self.state = 1
 
     def set_dead(self):
-        self.colors = ConwayCell.get_death_colors()
         self.state = 0
 
     def step(self, new_grid, old_grid):
@@ -90,3 +100,8 @@ class ConwayCell(Cell):
         intensity_values = np.repeat(face_colors, 2)
 
         return intensity_values
+
+
+# Triangle intensities shared by all the live and dead cells
+ConwayCell.ALIVE_COLORS = read_only(ConwayCell.get_alive_colors())
+ConwayCell.DEATH_COLORS = read_only(ConwayCell.get_death_colors())
@@ -1,15 +1,15 @@
-from pca.cell import Cell
+from pca.cell import Cell, read_only
 import numpy as np
 from pca.enum import Entity
 import random
 
 class MagicTerrain(Cell):
+    __slots__ = ()
+    stochastic = True
 
     def __init__(self, state=0, x=0, y=0, z=0, model={}):
         super().__init__(Entity.MAGIC_TERRAIN, state, x, y, z, model)
 
-        self.colors = MagicTerrain.get_colors()
-
     def __copy__(self):
         new_cell = MagicTerrain(state=self.state, x=self.x, y=self.y, z=self.z, model=self.model)
         return new_cell
@@ -46,4 +46,7 @@ class MagicTerrain(Cell):
         intensity_values = np.repeat(face_colors, 2)
 
         return intensity_values
-    
\ No newline at end of file
+
+
+# Triangle intensities shared by all the cells
+MagicTerrain.colors = read_only(MagicTerrain.get_colors())
@@ -1,20 +1,27 @@
 from pca.cell import Cell
 import numpy as np
-import trimesh
-import plotly.graph_objects as go
 from pca.enum import Entity
 import random
 
 class Rabbit(Cell):
+    __slots__ = ()
+    stochastic = True
 
     def __init__(self, state=0, x=0, y=0, z=0, model={}):
         super().__init__(Entity.RABBIT, state, x, y, z, model)
 
     def render(self):
 
-        norm_vertices = self.normalize_vertices_to_floor(self.vertices)
+        norm_vertices, faces, vertex_colors = self.instance_geometry()
         norm_vertices = norm_vertices + (self.x, self.y, self.z)
 
+        return norm_vertices, faces, vertex_colors
+
+    def instance_geometry(self):
+        norm_vertices = self.model.get('floor_vertices')
+        if norm_vertices is None:
+            norm_vertices = self.normalize_vertices_to_floor(self.vertices)
+
         return norm_vertices, self.faces, self.vertex_colors
     
     def step(self, new_grid, old_grid):
@@ -0,0 +1,47 @@
+import numpy as np
+from pca.cell import Cell, read_only
+from pca.enum import Entity
+
+class RuleCell(Cell):
+    """
+    Cube stepped by an OuterTotalisticRule engine. State 1 is alive and the
+    states above are the decaying states of Generations-style rules.
+    """
+
+    __slots__ = ()
+
+    # Face intensities cycled through by the decaying states
+    DECAY_COLORS = [16, 14, 12, 10, 8, 6, 4, 2]
+
+    def __init__(self, state=0, x=0, y=0, z=0, model={}):
+        super().__init__(Entity.RULE_CUBE, state, x, y, z, model)
+
+    @property
+    def colors(self):
+        return RuleCell.STATE_COLORS[RuleCell.color_index(self.state)]
+
+    @staticmethod
+    def color_index(state):
+        """Index of the color of a state: 0 dead, 1 alive, then the decay colors."""
+        if state < 2:
+            return state
+        return 2 + (state - 2) % len(RuleCell.DECAY_COLORS)
+
+    def render(self):
+        return self.vertices, self.faces, self.colors
+
+    @staticmethod
+    def get_colors(state):
+        if state == 0:
+            color = 0 # Black (Dead)
+        elif state == 1:
+            color = 18 # White (Alive)
+        else:
+            color = RuleCell.DECAY_COLORS[(state - 2) % len(RuleCell.DECAY_COLORS)]
+
+        # Same intensity for the 12 triangles of the cube
+        return np.full(12, color)
+
+
+# Triangle intensities shared by all the cells in each state, see color_index
+RuleCell.STATE_COLORS = [read_only(RuleCell.get_colors(state)) for state in range(2 + len(RuleCell.DECAY_COLORS))]
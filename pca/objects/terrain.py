@@ -1,14 +1,13 @@
-from pca.cell import Cell
+from pca.cell import Cell, read_only
 import numpy as np
 from pca.enum import Entity
 
 class Terrain(Cell):
+    __slots__ = ()
 
     def __init__(self, state=0, x=0, y=0, z=0, model={}):
         super().__init__(Entity.TERRAIN, state, x, y, z, model)
 
-        self.colors = Terrain.get_colors()
-
     def render(self):
         return self.vertices, self.faces, self.colors
     
@@ -24,4 +23,7 @@ class Terrain(Cell):
 
         # intensity_values = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11])
         return intensity_values
-    
\ No newline at end of file
+
+
+# Triangle intensities shared by all the cells
+Terrain.colors = read_only(Terrain.get_colors())
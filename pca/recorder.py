@@ -0,0 +1,119 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+class StateRecorder:
+    def __init__(self, path, shape=None, state_dtype=np.int16, readonly=False):
+        """
+        Append-only history of the (types, states) arrays of a World, one record per step.
+
+        The arrays are appended to raw files and read back through memory maps, so a
+        long run only keeps the current step in RAM and any range of steps can be
+        rendered afterwards (see World.render_recording).
+
+        :param path: The directory holding the recording, created if needed.
+        :param shape: The (max_x, max_y, max_z) grid size, read from the directory
+            metadata when opening an existing recording.
+        :param state_dtype: The NumPy dtype of the recorded states.
+        :param readonly: Only read an existing recording, e.g. from another process.
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        meta = self.read_meta()
+        if meta is not None:
+            if shape is not None and tuple(shape) != tuple(meta["shape"]):
+                raise ValueError(f"Recording {self.path} has shape {tuple(meta['shape'])}, not {tuple(shape)}")
+            shape = meta["shape"]
+            state_dtype = meta["state_dtype"]
+            self.length = meta["length"]
+        else:
+            if readonly:
+                raise ValueError(f"No recording in {self.path}")
+            if shape is None:
+                raise ValueError(f"No recording in {self.path}, a shape is needed to start one")
+            self.length = 0
+
+        self.shape = tuple(shape)
+        self.state_dtype = np.dtype(state_dtype)
+
+        # Memory maps over the recorded steps, rebuilt when steps are appended
+        self._maps = None
+
+        if readonly:
+            return
+
+        # Drop a partially written step left by an interrupted run
+        for name, dtype in (("types", np.uint8), ("states", self.state_dtype)):
+            file = self.file(name)
+            step_bytes = int(np.prod(self.shape)) * np.dtype(dtype).itemsize
+            if file.exists() and file.stat().st_size != self.length * step_bytes:
+                with open(file, "r+b") as f:
+                    f.truncate(self.length * step_bytes)
+
+        self.write_meta()
+
+    def file(self, name):
+        return self.path / f"{name}.bin"
+
+    def read_meta(self):
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return None
+        return json.loads(meta_path.read_text())
+
+    def write_meta(self):
+        meta = {
+            "shape": list(self.shape),
+            "state_dtype": self.state_dtype.str,
+            "length": self.length,
+        }
+        # Replace atomically so that readers never see a partial file
+        tmp_path = self.path / "meta.json.tmp"
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, self.path / "meta.json")
+
+    def __len__(self):
+        return self.length
+
+    def record(self, types, states):
+        """Append one step, given its type and state arrays of the grid shape."""
+        if types.shape != self.shape or states.shape != self.shape:
+            raise ValueError(f"Expected arrays of shape {self.shape}, got {types.shape} and {states.shape}")
+
+        with open(self.file("types"), "ab") as f:
+            f.write(np.ascontiguousarray(types, dtype=np.uint8).tobytes())
+        with open(self.file("states"), "ab") as f:
+            f.write(np.ascontiguousarray(states, dtype=self.state_dtype).tobytes())
+
+        self.length += 1
+        self.write_meta()
+
+    def maps(self):
+        """Return read-only (types, states) memory maps of shape (steps, *grid shape)."""
+        if self._maps is None or len(self._maps[0]) != self.length:
+            if self.length == 0:
+                return (
+                    np.zeros((0, *self.shape), dtype=np.uint8),
+                    np.zeros((0, *self.shape), dtype=self.state_dtype),
+                )
+            self._maps = (
+                np.memmap(self.file("types"), dtype=np.uint8, mode="r", shape=(self.length, *self.shape)),
+                np.memmap(self.file("states"), dtype=self.state_dtype, mode="r", shape=(self.length, *self.shape)),
+            )
+        return self._maps
+
+    def get(self, step):
+        """Return the (types, states) arrays of a recorded step (read-only views)."""
+        if not -self.length <= step < self.length:
+            raise IndexError(f"Step {step} not recorded ({self.length} steps)")
+        types, states = self.maps()
+        return types[step], states[step]
+
+    def steps(self, start=0, stop=None, stride=1):
+        """Yield (step, types, states) for a range of recorded steps, like range(start, stop, stride)."""
+        types, states = self.maps()
+        for step in range(*slice(start, stop, stride).indices(self.length)):
+            yield step, types[step], states[step]
@@ -0,0 +1,70 @@
+from multiprocessing import get_context, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# State of a worker process, set by the initializer given to start_pool
+worker = {}
+
+
+def start_pool(processes, initializer, initargs=()):
+    """
+    Start a pool of worker processes sharing memory blocks with this process.
+
+    :param processes: The number of workers, defaults to the number of cores.
+    :param initializer: Function called with initargs in every worker, it keeps its state in `worker`.
+    """
+    # The workers must share the tracker of this process, which unlinks the blocks
+    resource_tracker.ensure_running()
+    return get_context().Pool(processes, initializer, initargs)
+
+
+def create_array(shape, dtype):
+    """Allocate an array in a new shared memory block, return the block and the array."""
+    dtype = np.dtype(dtype)
+    memory = SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    return memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+def attach_array(name, shape, dtype):
+    """Attach to a block made by create_array, return the block and the array over it."""
+    memory = SharedMemory(name=name)
+    return memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+def free(memories):
+    """Close and unlink blocks made by create_array, once their arrays are no longer used."""
+    for memory in memories:
+        memory.close()
+        memory.unlink()
+
+
+def write_shared(arrays):
+    """Copy arrays to a new shared memory block, return its name and the array layouts."""
+    size = sum(array.nbytes for array in arrays)
+    block = SharedMemory(create=True, size=max(size, 1))
+
+    layouts = []
+    offset = 0
+    for array in arrays:
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf, offset=offset)
+        view[...] = array
+        layouts.append((array.dtype.str, array.shape, offset))
+        offset += array.nbytes
+
+    del view
+    block.close()
+    return block.name, layouts
+
+
+def read_shared(name, layouts):
+    """Copy the arrays out of a block made by write_shared, and free it."""
+    block = SharedMemory(name=name)
+    try:
+        return tuple(
+            np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset).copy()
+            for dtype, shape, offset in layouts
+        )
+    finally:
+        block.close()
+        block.unlink()
@@ -4,32 +4,117 @@ from pca.objects.rabbit import Rabbit
 from pca.objects.magic_terrain import MagicTerrain
 from pca.objects.conway_cell import ConwayCell
 from pca.objects.colorful_terrain import ColorfulTerrain
-from pca.display.renderer import Renderer
+from pca.objects.rule_cell import RuleCell
 
 from pca.display.models import ModelLoader
+from pca.engines.conway import ConwayEngine
+from pca.engines.magic import MagicTerrainEngine
+from pca.engines.agents import AgentEngine
+from pca.engines.hashlife import HashLifeEngine
+from pca.chunks import ChunkTracker
+from pca.grid import ArrayGrid, copy_at, object_grid_arrays, grid_arrays, cell_hashes, cell_values, state_hash
+from pca.engines.kernels import dilate, bounding_box
 from pca.enum import Entity
+from pca.instrumentation import NULL_INSTRUMENTATION
 import numpy as np
+import time
 
 class World:
-    def __init__(self, max_x=10, max_y=10, max_z=10):
+    def __init__(self, max_x=10, max_y=10, max_z=10, storage="object", chunk_size=16, headless=False, seed=None, instrumentation=None, **render_options):
         """
         Initializes the Cellular Automaton World with 3D grid size.
         
         :param grid_size: A tuple representing the grid's size (rows, columns, depth).
+        :param storage: "object" keeps one Cell instance per voxel, "array" keeps dense
+            typed arrays (see ArrayGrid) and only builds cells on demand in get_cell.
+        :param chunk_size: The x and y size of the chunks tracked for re-meshing.
+        :param headless: Skip the renderer and the model geometry, so that simulating
+            only needs NumPy. Both are set up on the first generate_frame or render call.
+        :param seed: Seed of the world random generator, for reproducible runs.
+        :param instrumentation: Optional Instrumentation (e.g. a Profiler) recording
+            the time of the phases of evolve and of the rendering, and work counters.
+        :param render_options: Options forwarded to the Renderer (e.g. meshing="greedy").
         """
         self.grid_size = (
             max_x, 
             max_y,
             max_z
         )
-        self.loader = ModelLoader()
+        self.headless = headless
+        self.render_options = render_options
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+        # Random generator of the stochastic engines
+        self.rng = np.random.default_rng(seed)
+        self.loader = None
+        self.renderer = None
 
         max_x, max_y, max_z = self.grid_size[:3]
 
-        # Create a 3D grid for storing Cell objects
-        self.grid = np.empty((max_x, max_y, max_z), dtype=object)
+        match storage:
+            case "object":
+                # Create a 3D grid for storing Cell objects
+                self.grid = np.empty((max_x, max_y, max_z), dtype=object)
+            case "array":
+                self.grid = ArrayGrid((max_x, max_y, max_z), factory=self.materialize_cell)
+            case _:
+                raise ValueError(f"Unknown storage mode {storage}")
+        self.storage = storage
+
+        # Chunks changed since the last frame, only those get re-meshed
+        self.chunks = ChunkTracker(self.grid_size, chunk_size)
+        # Mask of the cells changed by the last evolve
+        self.changed = None
+
+        # Second grid written by evolve, then swapped with self.grid
+        self.back = None
+        # Cells where self.back is behind self.grid, as (n, 3) positions or boolean masks
+        self.stale = []
+        # uint8 types of the cells of object storage, behind self.grid at the stale cells (see object_types)
+        self.types = None
+
+        # entity -> Cell class stepped by Cell.step, see cell_class
+        self.cell_classes = {}
+        # entity -> Cell class built by create_entity, see entity_class
+        self.entity_classes = {}
+
+        # Number of generations computed by evolve (and leap)
+        self.generation = 0
+        # Hash of the current state, None when it has to be recomputed (see state_hash)
+        self.current_hash = None
+        # state hash -> last generation having that state, for the last max_period generations
+        self.history = {}
+        self.max_period = 64
+        # Period of the cycle reached by the last evolve (1 for a fixed point), or None
+        self.period = None
+        # Whether the last evolve stepped random rules, None when unknown (before it or after edits)
+        self.stochastic = None
+
+        # Whole-grid engines, entity -> Engine
+        self.engines = {}
+        self.register_engine(ConwayEngine())
+        self.register_engine(MagicTerrainEngine(self.rng))
+        self.register_engine(AgentEngine(Entity.RABBIT, self.rng))
+        # Engine of leap, created on the first call
+        self.hashlife = None
+
+        if not headless:
+            self.start_rendering()
+
+    def start_rendering(self):
+        """Load the models and create the renderer (the display modules are only imported here)."""
+        from pca.display.renderer import Renderer
+
+        if self.loader is None:
+            self.loader = ModelLoader()
+
+            # Cells created while headless have no geometry yet
+            if self.storage == "object":
+                for x, y, z in np.argwhere(self.grid != None):
+                    cell = self.grid[x, y, z]
+                    cell.set_model(self.loader.get_model(cell.type))
 
-        self.renderer = Renderer(self.grid, self.grid_size)
+        if self.renderer is None:
+            self.renderer = Renderer(self.grid, self.grid_size, instrumentation=self.instrumentation, **self.render_options)
 
     def _is_within_bounds(self, x, y, z):
         return (
@@ -39,97 +124,704 @@ class World:
         )
 
     def get_cell(self, x, y, z):
+        """
+        Return the cell at (x, y, z). With array storage the cell is built on
+        demand, so changes made to it must be written back with set_cell or set_state.
+        """
         if self._is_within_bounds(x, y, z):
+            if self.storage == "array":
+                return self.grid.get_cell(x, y, z)
             return self.grid[x, y, z]
         raise IndexError("Indices out of bounds")
         
     def set_cell(self, x, y, z, element):
+        """
+        Put a cell at (x, y, z). With array storage, only the type and state are
+        kept and get_cell builds the cell again, so the cell must be one built by
+        create_entity.
+        """
         if self._is_within_bounds(x, y, z):
-            self.grid[x, y, z] = element
+            if self.storage == "array":
+                if element is not None and type(element) is not self.entity_class(element.type):
+                    raise ValueError(
+                        f"Array storage cannot hold a {type(element).__name__} of type {element.type}, "
+                        "only the cells built by create_entity"
+                    )
+                self.grid.set_cell(x, y, z, element)
+            else:
+                self.grid[x, y, z] = element
+            self.chunks.mark(x, y)
+            self.mark_stale([(x, y, z)])
         else:
             raise IndexError("Indices out of bounds")
+
+    def set_state(self, x, y, z, state):
+        """Update the state of the cell at (x, y, z)."""
+        if not self._is_within_bounds(x, y, z):
+            raise IndexError("Indices out of bounds")
+        if self.storage == "array":
+            if self.grid.types[x, y, z] == 0:
+                raise ValueError(f"No cell at {(x, y, z)}")
+            self.grid.states[x, y, z] = state
+        else:
+            cell = self.grid[x, y, z]
+            if cell is None:
+                raise ValueError(f"No cell at {(x, y, z)}")
+            cell.update(state)
+        self.chunks.mark(x, y)
+        self.mark_stale([(x, y, z)])
+
+    def mark_dirty(self, x, y, z):
+        """
+        Flag a cell modified in place (e.g. through get_cell) or written directly
+        into self.grid, so that it gets re-meshed and copied to the second grid.
+        """
+        self.chunks.mark(x, y)
+        self.mark_stale([(x, y, z)])
+
+    def mark_all_dirty(self):
+        """Same as mark_dirty for every cell, e.g. after writing the grid arrays directly."""
+        self.chunks.mark_all()
+        self.back = None
+        self.stale = []
+        self.types = None
+        self.current_hash = None
+        self.history = {}
+        self.stochastic = None
+
+    def mark_stale(self, index):
+        """
+        Record cells edited outside evolve, as (n, 3) positions or a boolean mask:
+        they are copied to the second grid and the state hash is recomputed.
+        """
+        self.stale.append(index)
+        self.current_hash = None
+        # The past states no longer tell the next ones
+        self.history = {}
+        self.stochastic = None
     
     def set_terrain(self, enum, x, y, z):
-        terrain = self.create_entity(enum, x, y, z)
-        self.grid[x, y, z] = terrain
+        self.set_entity(enum, x, y, z)
 
 
     def set_entity(self, enum, x, y, z):
+        self.chunks.mark(x, y)
+        self.mark_stale([(x, y, z)])
+        if self.storage == "array":
+            # No need to build the cell, only its type is stored
+            self.grid.types[x, y, z] = enum if enum is not None and self.is_buildable(enum) else 0
+            self.grid.states[x, y, z] = 0
+            return
         entity = self.create_entity(enum, x, y, z)
         self.grid[x, y, z] = entity
 
 
+    def set_entities(self, positions, entities):
+        """
+        Set many cells at once, like successive set_entity calls.
+
+        :param positions: The (n, 3) positions of the cells.
+        :param entities: One entity type for all the cells, or one per cell (None or 0 clears a cell).
+        """
+        positions = np.asarray(positions, dtype=np.intp).reshape(-1, 3)
+        if not np.all((positions >= 0) & (positions < self.grid_size)):
+            raise IndexError("Indices out of bounds")
+
+        if np.ndim(entities) == 0:
+            mask = np.zeros(self.grid_size, dtype=bool)
+            mask[tuple(positions.T)] = True
+            self.set_entity_mask(entities, mask)
+            return
+
+        entities = np.asarray(entities)
+        if entities.dtype == object:
+            entities = np.array([0 if entity is None else int(entity) for entity in entities], dtype=np.uint8)
+        entities = entities.astype(np.uint8)
+        if len(entities) != len(positions):
+            raise ValueError(f"Got {len(entities)} entities for {len(positions)} positions")
+
+        # The last entity given for a position wins
+        linear = np.ravel_multi_index(tuple(positions.T), self.grid_size)
+        _, last = np.unique(linear[::-1], return_index=True)
+        keep = len(linear) - 1 - last
+        positions, entities = positions[keep], entities[keep]
+
+        columns = np.zeros(self.grid_size[:2], dtype=bool)
+        columns[positions[:, 0], positions[:, 1]] = True
+        self.chunks.mark_mask(columns)
+        self.mark_stale(positions)
+
+        if self.storage == "array":
+            # Like create_entity, the types without cell class leave the cell empty
+            for entity in np.unique(entities).tolist():
+                if entity and not self.is_buildable(entity):
+                    entities[entities == entity] = 0
+
+            index = tuple(positions.T)
+            self.grid.types[index] = entities
+            self.grid.states[index] = 0
+            return
+        for (x, y, z), entity in zip(positions.tolist(), entities.tolist()):
+            self.grid[x, y, z] = self.create_entity(entity, x, y, z)
+
+
+    def set_entity_mask(self, enum, mask):
+        """
+        Set every cell of a boolean mask of the grid shape to one entity type,
+        like set_entity on each of them (None clears the cells).
+        """
+        self.chunks.mark_mask(mask)
+        self.mark_stale(mask)
+        if self.storage == "array":
+            self.grid.types[mask] = enum if enum is not None and self.is_buildable(enum) else 0
+            self.grid.states[mask] = 0
+            return
+        if enum is None or not self.is_buildable(enum):
+            self.grid[mask] = None
+            return
+        for x, y, z in np.argwhere(mask).tolist():
+            self.grid[x, y, z] = self.create_entity(enum, x, y, z)
+
+
     def set_terrain_with_heightmap(self, enum, height_map):
-        np_map = np.array(height_map)
-        for x, y in np.ndindex(np_map.shape):
-            value = np_map[x, y]
-            for z in range(value):
-                self.set_terrain(enum, x, y, z)
+        """Fill every (x, y) column of the height map from z = 0 up to its height."""
+        heights = np.asarray(height_map, dtype=np.intp)
+        if heights.size == 0:
+            return
+        if (
+            heights.ndim != 2 or
+            heights.shape[0] > self.grid_size[0] or
+            heights.shape[1] > self.grid_size[1] or
+            heights.max() > self.grid_size[2]
+        ):
+            raise IndexError("Indices out of bounds")
+
+        mask = np.zeros(self.grid_size, dtype=bool)
+        np.less(np.arange(self.grid_size[2]), heights[..., None], out=mask[:heights.shape[0], :heights.shape[1]])
+        self.set_entity_mask(enum, mask)
 
 
     def set_entity_with_dict(self, entity_dict):
-        for (x, y) in entity_dict:
-            if not 0 <= x < self.grid_size[0] or not 0 <= y < self.grid_size[1]:
-                continue
-            enum = entity_dict.get((x, y), None)
-            z = self.find_lowest_z(x, y)
-            self.set_entity(enum, x, y, z)
+        """Place the entities of a {(x, y): entity} dict on the lowest free cell of their column."""
+        columns = [
+            (x, y) for (x, y) in entity_dict
+            if 0 <= x < self.grid_size[0] and 0 <= y < self.grid_size[1]
+        ]
+        if not columns:
+            return
+        xs, ys = np.array(columns).T
+        zs = self.lowest_empty_z(xs, ys)
+        self.set_entities(np.stack([xs, ys, zs], axis=1), [entity_dict[column] for column in columns])
 
 
     def find_lowest_z(self, x, y):
         """Find the lowest unoccupied z position for a given (x, y)."""
-        max_z = self.grid_size[2]
-        for z in range(max_z):
-            if self.grid[x, y, z] is None:  # If the position is unoccupied
-                return z
-        return max_z - 1
+        return int(self.lowest_empty_z([x], [y])[0])
+
+
+    def lowest_empty_z(self, xs, ys):
+        """Lowest unoccupied z of several (x, y) columns, the top one for the full columns."""
+        if self.storage == "array":
+            empty = self.grid.types[xs, ys] == 0
+        else:
+            empty = self.grid[xs, ys] == None
+        zs = np.argmax(empty, axis=1)
+        zs[~empty.any(axis=1)] = self.grid_size[2] - 1
+        return zs
     
 
+    def get_model(self, entity):
+        """Model of an entity, empty until rendering starts for headless worlds."""
+        if self.loader is None:
+            return {}
+        return self.loader.get_model(entity)
+
+
     def create_entity(self, entity, x, y, z, model=None):
         match entity:
             case Entity.RABBIT:
-                model = self.loader.get_model(entity)
+                model = self.get_model(entity)
                 return Rabbit(state=0, x=x, y=y, z=z, model=model)
             case Entity.TERRAIN:
-                model = self.loader.get_model(entity)
+                model = self.get_model(entity)
                 return Terrain(state=0, x=x, y=y, z=z, model=model)
             case Entity.COLORFUL_TERRAIN:
-                model = self.loader.get_model(entity)
+                model = self.get_model(entity)
                 return ColorfulTerrain(state=0, x=x, y=y, z=z, model=model)
             case Entity.MAGIC_TERRAIN:
-                model = self.loader.get_model(entity)
+                model = self.get_model(entity)
                 return MagicTerrain(state=0, x=x, y=y, z=z, model=model)
             case Entity.CONWAY_CUBE:
-                model = self.loader.get_model(entity)
+                model = self.get_model(entity)
                 return ConwayCell(state=0, x=x, y=y, z=z, model=model)
+            case Entity.RULE_CUBE:
+                model = self.get_model(entity)
+                return RuleCell(state=0, x=x, y=y, z=z, model=model)
             case _:
                 return None
         return None
+
+
+    def materialize_cell(self, entity, x, y, z, state=0):
+        """Build the Cell for a stored (type, state) pair, used by array storage."""
+        cell = self.create_entity(entity, x, y, z)
+        if cell is not None:
+            cell.update(state)
+        return cell
+
+
+    def state_arrays(self):
+        """
+        Export the world as a (types, states) pair of arrays, whatever the storage.
+        The arrays are copies and can be kept while the world keeps evolving.
+        """
+        if self.storage == "array":
+            return self.grid.types.copy(), self.grid.states.copy()
+        return object_grid_arrays(self.grid)
+
+
+    def load_state(self, types, states):
+        """
+        Overwrite the world with a (types, states) pair of arrays, e.g. a recorded step.
+        Only the cells that differ from the current state are rebuilt and re-meshed.
+        """
+        old_types, old_states = grid_arrays(self.grid)
+        changed = (old_types != types) | (old_states != states)
+
+        if self.storage == "array":
+            self.grid.types[...] = types
+            self.grid.states[...] = states
+        else:
+            for x, y, z in np.argwhere(changed):
+                self.grid[x, y, z] = self.materialize_cell(int(types[x, y, z]), int(x), int(y), int(z), int(states[x, y, z]))
+
+        self.changed = changed
+        self.chunks.mark_mask(changed)
+        self.mark_stale(changed)
+
+
+    def record(self, recorder):
+        """Append the current state of the world to a StateRecorder."""
+        recorder.record(*grid_arrays(self.grid))
+
+
+    def render_recording(self, recorder, start=0, stop=None, stride=1, processes=None):
+        """
+        Render a range of steps of a StateRecorder into a figure, one frame per step.
+        The world is left in the state of the last rendered step.
+
+        :param recorder: The StateRecorder holding the steps.
+        :param start: The first step to render.
+        :param stop: The step to stop before (None for the last recorded one).
+        :param stride: Render one step every stride steps.
+        :param processes: Mesh the terrain of the steps in that many worker processes
+            (None to mesh them here, 0 for one per core).
+        """
+        if self.renderer is None:
+            self.start_rendering()
+
+        if processes is None:
+            for _, types, states in recorder.steps(start, stop, stride):
+                self.load_state(types, states)
+                self.generate_frame()
+            return self.render()
+
+        from pca.display.parallel import mesh_recording
+
+        steps = range(*slice(start, stop, stride).indices(len(recorder)))
+        meshes = mesh_recording(
+            recorder, steps, type(self),
+            greedy=self.renderer.meshing == "greedy",
+            processes=processes or None,
+        )
+        for step, terrain in zip(steps, meshes):
+            # The entities are still meshed here, from the loaded state
+            self.load_state(*recorder.get(step))
+            self.renderer.set_elements(self.grid, self.grid_size, self.chunks)
+            self.renderer.add_frame(terrain)
+        return self.render()
     
 
+    def register_engine(self, engine):
+        """
+        Step the engine's entity types with a whole-grid Engine instead of
+        calling Cell.step on each cell.
+        """
+        for entity in engine.entities:
+            self.engines[entity] = engine
+
+
+    def leap(self, generations, engine=None):
+        """
+        Advance the Conway layers by a number of generations at once, e.g. to
+        look at a pattern a million generations later. The other cells do not
+        evolve meanwhile.
+
+        :param generations: The number of generations.
+        :param engine: The HashLifeEngine to use, by default one kept by the world
+            so that its memoized results are reused by the next leaps. Any engine
+            with a leap method works, e.g. a ParallelEngine, which keeps the grid
+            in shared memory between the generations.
+        """
+        if engine is None:
+            if self.hashlife is None:
+                self.hashlife = HashLifeEngine()
+            engine = self.hashlife
+
+        types, states = self.state_arrays()
+        with self.instrumentation.phase("leap"):
+            new_types, new_states = engine.leap(types, states, generations)
+        self.load_state(new_types, new_states)
+        self.generation += generations
+
+
     def evolve(self):
         """
-        Evolves the cellular automaton world. This is just a placeholder.
-        You can implement rule-based evolution logic here.
+        Evolves the cellular automaton world by one generation.
+
+        Entity types with a registered Engine are stepped on the typed arrays,
+        the remaining cells through their own Cell.step.
+
+        The world keeps two grids and swaps them every generation. Cell.step and
+        the engines read the current generation from old_grid, and write the cells
+        that change into new_grid, which holds the same cells as old_grid when the
+        step starts. Only the cells changed since the last swap are copied to
+        new_grid, so cells written directly into self.grid must be flagged with
+        mark_dirty (or mark_all_dirty).
+
+        Those changes also bound the work: a deterministic cell only steps when
+        a cell within one cell of it changed, and a deterministic engine only
+        advances the box around the changes. Stochastic cells and engines
+        (random rules) always step. Cells inheriting the no-op Cell.step are skipped.
+        """
+        with self.instrumentation.phase("evolve"):
+            self._evolve()
+
+
+    def _evolve(self):
+        instrumentation = self.instrumentation
+        previous_hash = self.state_hash()
+        active = self.active_region()
+        old_grid = self.grid
+
+        types = old_grid.types if self.storage == "array" else self.object_types()
+        present = np.bincount(types.ravel(), minlength=256)
+        entities = np.flatnonzero(present[1:]) + 1
+        stepping = [
+            entity for entity in entities.tolist()
+            if entity not in self.engines and self.cell_class(entity) is not None
+        ]
+        candidates = self.step_candidates(types, stepping, active) if stepping else None
+
+        with instrumentation.phase("evolve/sync_back"):
+            new_grid = self.sync_back()
+
+        if self.storage == "array":
+            if candidates is not None and candidates.any():
+                # Cells are only materialized around the stepping ones, for the duration of the step
+                around = dilate(candidates, 1)
+                with instrumentation.phase("evolve/materialize"):
+                    old_cells = old_grid.materialize(around)
+                    new_cells = old_cells.copy()
+                self._step_cells(new_cells, old_cells, candidates)
+                with instrumentation.phase("evolve/materialize"):
+                    new_grid.assign(new_cells, around)
+
+            self._step_engines(new_grid, old_grid, present, active)
+            changed = (new_grid.types != old_grid.types) | (new_grid.states != old_grid.states)
+        else:
+            if candidates is not None:
+                self._step_cells(new_grid, old_grid, candidates)
+
+            engine_entities = [entity for entity in entities.tolist() if entity in self.engines]
+            if engine_entities:
+                self._step_object_engines(new_grid, old_grid, active, engine_entities)
+
+            # Cells are only replaced when they change
+            changed = new_grid != old_grid
+
+        # Only the changed cells are hashed again
+        index = np.flatnonzero(changed)
+        instrumentation.count("evolve/changed_cells", len(index))
+        with instrumentation.phase("evolve/hash"):
+            self.current_hash = previous_hash
+            for grid in (old_grid, new_grid):
+                hashes = cell_hashes(index, *cell_values(grid, index))
+                self.current_hash ^= int(np.bitwise_xor.reduce(hashes, initial=np.uint64(0)))
+
+        self.grid, self.back = new_grid, old_grid
+        self.stale = [changed]
+
+        self.changed = changed
+        self.chunks.mark_mask(changed)
+
+        self.generation += 1
+        self.stochastic = self.is_stochastic(entities)
+        self.find_cycle(previous_hash, self.stochastic)
+
+
+    def state_hash(self):
+        """
+        64-bit hash of the types and states of all the cells. evolve updates it
+        from the changed cells only, it is recomputed after other edits.
+        """
+        if self.current_hash is None:
+            self.current_hash = state_hash(*grid_arrays(self.grid))
+        return self.current_hash
+
+
+    def find_cycle(self, previous_hash, stochastic):
+        """
+        Set self.period when the state reached by evolve is one of the last
+        max_period generations. The world then repeats itself as long as it is
+        not edited, a period of 1 being a fixed point. States reached through
+        random rules do not count.
+        """
+        if stochastic:
+            self.history = {}
+            self.period = None
+            return
+
+        if previous_hash not in self.history:
+            self.history[previous_hash] = self.generation - 1
+
+        seen = self.history.pop(self.current_hash, None)
+        self.period = None if seen is None else self.generation - seen
+        self.history[self.current_hash] = self.generation
+
+        # The history is ordered by generation
+        oldest = self.generation - self.max_period
+        for key in list(self.history):
+            if self.history[key] >= oldest:
+                break
+            del self.history[key]
+
+
+    def is_stochastic(self, entities):
+        """Whether the step of some of the given entity types is random."""
+        for entity in entities:
+            engine = self.engines.get(entity)
+            if engine is not None:
+                if engine.stochastic:
+                    return True
+            elif (cell_class := self.cell_class(entity)) is not None and cell_class.stochastic:
+                return True
+        return False
+
+
+    def run(self, generations, frames=False, stop_on_cycle=True):
+        """
+        Evolve the world by up to a number of generations.
+
+        :param generations: The maximum number of generations.
+        :param frames: Generate a frame after each generation.
+        :param stop_on_cycle: Stop once the world repeats a recent state (see
+            find_cycle), the next generations being the same cycle again.
+        :return: The number of generations computed.
+        """
+        for generation in range(generations):
+            self.evolve()
+            if frames:
+                self.generate_frame()
+            if stop_on_cycle and self.period is not None:
+                return generation + 1
+        return generations
+
+
+    def active_region(self):
+        """
+        Mask of the cells changed since the last evolve (the generation it computed
+        and the later edits), None when unknown, e.g. before the first evolve.
         """
-        new_grid = self.grid.copy()
+        if self.back is None:
+            return None
+        active = np.zeros(self.grid_size, dtype=bool)
+        for stale in self.stale:
+            stale = np.asarray(stale)
+            if stale.dtype == bool:
+                active |= stale
+            else:
+                active[tuple(stale.reshape(-1, 3).T)] = True
+        return active
 
-        mask = self.grid != None
-        indices = np.argwhere(mask)
 
-        for x, y, z in indices:
-            self.grid[x, y, z].step(new_grid, self.grid)
+    def entity_class(self, entity):
+        """The Cell class create_entity builds for an entity type, None when it builds none."""
+        if entity not in self.entity_classes:
+            cell = self.create_entity(entity, 0, 0, 0)
+            self.entity_classes[entity] = None if cell is None else type(cell)
+        return self.entity_classes[entity]
 
-        self.grid = new_grid
+
+    def is_buildable(self, entity):
+        """Whether create_entity builds cells of an entity type, the other types leave the cell empty."""
+        return self.entity_class(entity) is not None
+
+
+    def cell_class(self, entity):
+        """The Cell class of an entity type, None when its cells never step by themselves."""
+        if entity not in self.cell_classes:
+            cell = self.create_entity(entity, 0, 0, 0)
+            stepping = cell is not None and type(cell).step is not Cell.step
+            self.cell_classes[entity] = type(cell) if stepping else None
+        return self.cell_classes[entity]
+
+
+    def step_candidates(self, types, entities, active):
+        """Mask of the cells of the given entity types that have to step, see evolve."""
+        candidates = np.isin(types, entities)
+        if active is None:
+            return candidates
+
+        stochastic = [entity for entity in entities if self.cell_class(entity).stochastic]
+        near_changes = dilate(active, 1)
+        if stochastic:
+            near_changes |= np.isin(types, stochastic)
+        return candidates & near_changes
+
+
+    def sync_back(self):
+        """Bring the second grid up to date with self.grid and return it."""
+        if self.back is None:
+            self.back = self.grid.copy()
+        else:
+            for stale in self.stale:
+                stale = np.asarray(stale)
+                index = stale if stale.dtype == bool else tuple(stale.reshape(-1, 3).T)
+                if self.storage == "array":
+                    self.back.copy_cells(self.grid, index)
+                else:
+                    copy_at(self.back, self.grid, index)
+        self.stale = []
+        return self.back
+
+
+    def object_types(self):
+        """
+        Return the uint8 type array of the object grid. It is kept between calls
+        and only updated at the cells edited or changed since, see mark_stale.
+        """
+        if self.types is None:
+            self.types = object_grid_arrays(self.grid)[0]
+        else:
+            for stale in self.stale:
+                stale = np.asarray(stale)
+                if stale.dtype == bool:
+                    index = np.flatnonzero(stale)
+                else:
+                    index = np.ravel_multi_index(tuple(stale.reshape(-1, 3).T), self.grid_size)
+                self.types.reshape(-1)[index] = cell_values(self.grid, index)[0]
+        return self.types
+
+
+    def _step_cells(self, new_grid, old_grid, candidates):
+        """
+        Step the cells without engine.
+
+        :param candidates: Mask of the cells to step, see step_candidates.
+        """
+        instrumentation = self.instrumentation
+        # Per entity type step times, only taken when instrumented
+        timed = instrumentation.enabled
+        stepped = 0
+
+        for x, y, z in np.argwhere(candidates):
+            cell = old_grid[x, y, z]
+            if timed:
+                start = time.perf_counter()
+                cell.step(new_grid, old_grid)
+                instrumentation.add_time(f"evolve/cells/{Entity.name_of(cell.type)}", time.perf_counter() - start)
+            else:
+                cell.step(new_grid, old_grid)
+            stepped += 1
+
+        instrumentation.count("evolve/stepped_cells", stepped)
+
+
+    def _step_engines(self, new_arrays, old_arrays, present, active=None):
+        """
+        Step the engines of the present entity types.
+
+        :param active: Mask of the cells changed since the last evolve, the
+            deterministic engines only advance the box around them.
+        """
+        changed = np.zeros(old_arrays.shape, dtype=bool)
+
+        for engine in dict.fromkeys(self.engines.values()):
+            if not any(present[entity] for entity in engine.entities):
+                continue
+            name = "evolve/engine/" + "+".join(Entity.name_of(entity) for entity in engine.entities)
+            if active is None or engine.stochastic:
+                with self.instrumentation.phase(name):
+                    changed |= engine.step(new_arrays, old_arrays)
+            else:
+                region = bounding_box(active, engine.radius)
+                if region is not None:
+                    with self.instrumentation.phase(name):
+                        changed |= engine.step(new_arrays, old_arrays, region)
+
+        return changed
+
+
+    def _step_object_engines(self, new_grid, old_grid, active, entities):
+        """Step the engines of the given entity types on arrays built from the object grid, only around the changes when possible."""
+        engines = [self.engines[entity] for entity in entities]
+        block = tuple(slice(0, size) for size in self.grid_size)
+        if active is not None and not any(engine.stochastic for engine in engines):
+            # The engines read up to radius cells around the cells they may change
+            margin = 2 * max(engine.radius for engine in engines)
+            block = bounding_box(active, margin)
+            if block is None:
+                return
+
+        with self.instrumentation.phase("evolve/materialize"):
+            old_arrays = ArrayGrid.from_objects(old_grid[block])
+            new_arrays = old_arrays.copy()
+        present = np.bincount(old_arrays.types.ravel(), minlength=256)
+        changed = self._step_engines(new_arrays, old_arrays, present, None if active is None else active[block])
+
+        # Only the cells changed by the engines get new Cell objects
+        offset = np.array([box.start for box in block])
+        for position in np.argwhere(changed):
+            entity = int(new_arrays.types[tuple(position)])
+            state = int(new_arrays.states[tuple(position)])
+            x, y, z = (int(i) for i in position + offset)
+            new_grid[x, y, z] = self.materialize_cell(entity, x, y, z, state)
 
 
     def generate_frame(self):
-        self.renderer.set_elements(self.grid, self.grid_size)
-        self.renderer.add_frame()
+        if self.renderer is None:
+            self.start_rendering()
+        self.renderer.set_elements(self.grid, self.grid_size, self.chunks)
+        # The frame of a state met recently is reused, states only repeat without random rules
+        key = self.state_hash() if self.stochastic is False else None
+        self.renderer.add_frame(key=key)
+        self.instrumentation.end_frame()
             
                 
+    def stream_to(self, path, **options):
+        """
+        Write the next generated frames to an .html or .json file as they are
+        produced, keeping only the current frame in memory. Call close_stream
+        once the last frame is generated.
+
+        :param path: The output file.
+        :param options: Options forwarded to the FigureWriter (e.g. auto_play=True).
+        """
+        if self.renderer is None:
+            self.start_rendering()
+        return self.renderer.stream_to(path, **options)
+
+
+    def close_stream(self):
+        """Complete the file of stream_to."""
+        self.renderer.close_stream()
+
+                
     def render(self):
         """
         Render the automaton world in 3D.
         """
+        if self.renderer is None:
+            self.start_rendering()
         return self.renderer.render()
\ No newline at end of file
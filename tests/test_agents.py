@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from pca.world import World
+from pca.enum import Entity
+from pca.engines.agents import AgentStore, FACE_MOVES
+
+
+def test_lowest_index_wins_a_conflict():
+    agents = AgentStore([(0, 0, 0), (2, 0, 0), (4, 4, 0), (0, 2, 0)])
+    targets = np.array([(1, 0, 0), (1, 0, 0), (4, 3, 0), (1, 0, 0)])
+    moving = np.array([True, True, True, False])
+
+    allowed = agents.resolve_conflicts(targets, moving, (5, 5, 1))
+    assert allowed.tolist() == [True, False, True, False]
+
+
+def test_moves_only_lead_to_empty_cells():
+    types = np.zeros((3, 3, 1), dtype=np.uint8)
+    types[1, 0, 0] = types[0, 1, 0] = Entity.TERRAIN
+    agents = AgentStore([(0, 0, 0), (2, 2, 0)])
+    types[0, 0, 0] = types[2, 2, 0] = Entity.RABBIT
+
+    targets, moving = agents.propose_moves(types, FACE_MOVES, np.random.default_rng(0))
+    # The first rabbit is walled in by the terrain and the grid edges
+    assert moving.tolist() == [False, True]
+    assert targets[0].tolist() == [0, 0, 0]
+    assert targets[1].tolist() in ([1, 2, 0], [2, 1, 0])
+
+
+def test_sync_follows_the_cells():
+    types = np.zeros((4, 4, 2), dtype=np.uint8)
+    types[0, 0, 0] = types[1, 1, 1] = Entity.RABBIT
+    agents = AgentStore([(0, 0, 0), (3, 3, 1)])
+    agents.add_attribute("age", np.int32, fill=7)
+
+    agents.sync(types, Entity.RABBIT)
+    assert agents.positions.tolist() == [[0, 0, 0], [1, 1, 1]]
+    assert agents.attributes["age"].tolist() == [7, 7]
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+def test_crowded_rabbits_are_conserved(storage):
+    world = World(5, 5, 3, storage=storage, headless=True, seed=0)
+    world.set_terrain_with_heightmap(Entity.TERRAIN, np.ones((5, 5)))
+    # Many rabbits fighting over few empty cells
+    rabbits = [(x, y, z) for x in range(5) for y in range(5) for z in (1, 2) if (x + y + z) % 3]
+    world.set_entities(rabbits, Entity.RABBIT)
+
+    before = world.state_arrays()[0]
+    moves = 0
+    for _ in range(30):
+        world.evolve()
+        after = world.state_arrays()[0]
+        assert np.count_nonzero(after == Entity.RABBIT) == len(rabbits)
+        assert np.array_equal(after == Entity.TERRAIN, before == Entity.TERRAIN)
+        # Every rabbit comes from a face neighbor or stays
+        moved_in = np.argwhere((after == Entity.RABBIT) & (before != Entity.RABBIT))
+        moves += len(moved_in)
+        for position in moved_in:
+            sources = [tuple(position - move) for move in FACE_MOVES]
+            assert any(
+                all(0 <= i < size for i, size in zip(source, after.shape)) and before[source] == Entity.RABBIT
+                for source in sources
+            )
+        before = after
+    assert moves > 0
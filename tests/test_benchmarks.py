@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from benchmarks.cases import CASES
+from benchmarks.run import compare, main, measure
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case.name for case in CASES])
+def test_cases_run_on_a_small_grid(case):
+    result = measure(case, 14, repeat=1)
+    assert result["case"] == case.name and result["size"] == 14
+    assert result["time"]["min"] > 0
+    assert result["peak_memory"] > 0
+
+
+def test_meshing_cases_count_the_same_triangles():
+    results = {case.name: measure(case, 14, repeat=1) for case in CASES if case.name.startswith("render_grid/")}
+    assert results["render_grid/cells"]["triangles"] == results["render_grid/vectorized"]["triangles"]
+    assert 0 < results["render_grid/greedy"]["triangles"] < results["render_grid/vectorized"]["triangles"]
+
+
+def result(case, time, memory):
+    return {"case": case, "size": 14, "time": {"min": time}, "peak_memory": memory}
+
+
+def test_compare_reports_regressions():
+    baseline = {"results": [result("a", 1.0, 100 * 2**20), result("b", 1.0, 100 * 2**20)]}
+    results = [result("a", 1.2, 110 * 2**20), result("b", 1.5, 200 * 2**20), result("c", 9.0, 2**30)]
+
+    regressions = compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 2
+    assert all(regression.startswith("b 14") for regression in regressions)
+    assert results[0]["baseline_ratio"] == pytest.approx(1.2)
+    assert "baseline_ratio" not in results[2]
+
+
+def test_baseline_round_trip(tmp_path, capsys):
+    output = tmp_path / "results.json"
+    assert main(["--sizes", "14", "--cases", "set_terrain", "--repeat", "1", "--output", str(output)]) == 0
+    results = json.loads(output.read_text())
+    assert [r["case"] for r in results["results"]] == ["set_terrain_with_heightmap"]
+
+    # Against a baseline claiming it used to be instant, it is a regression
+    for r in results["results"]:
+        r["time"]["min"] = 1e-9
+    output.write_text(json.dumps(results))
+    assert main(["--sizes", "14", "--cases", "set_terrain", "--repeat", "1", "--baseline", str(output)]) == 1
+    assert "Regression: set_terrain_with_heightmap 14" in capsys.readouterr().out
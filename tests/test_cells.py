@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from pca.world import World
+from pca.enum import Entity
+
+
+BUILDABLE = [
+    Entity.TERRAIN, Entity.COLORFUL_TERRAIN, Entity.MAGIC_TERRAIN,
+    Entity.CONWAY_CUBE, Entity.RULE_CUBE, Entity.RABBIT,
+]
+
+
+@pytest.mark.parametrize("entity", BUILDABLE)
+def test_cells_share_their_type_data(entity):
+    world = World(3, 3, 3, storage="array")
+    first, second = world.create_entity(entity, 0, 0, 0), world.create_entity(entity, 1, 2, 0)
+
+    # Slotted cells carry no per-instance dictionary
+    assert not hasattr(first, "__dict__")
+    with pytest.raises(AttributeError):
+        first.colour = 1
+
+    assert first.model is second.model
+    vertices, faces, colors = first.render()
+    other_vertices, other_faces, other_colors = second.render()
+    assert other_faces is faces
+    if entity != Entity.RABBIT:
+        assert other_vertices is vertices
+        assert other_colors is colors
+        if isinstance(colors, np.ndarray):
+            assert not colors.flags.writeable
+
+
+def test_state_colors_follow_the_state():
+    world = World(3, 3, 3, storage="array")
+    cell = world.materialize_cell(Entity.CONWAY_CUBE, 0, 0, 0, state=1)
+    alive = cell.render()[2]
+    cell.update(0)
+    assert not np.array_equal(cell.render()[2], alive)
+    assert world.materialize_cell(Entity.CONWAY_CUBE, 2, 2, 2, state=1).render()[2] is alive
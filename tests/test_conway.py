@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from pca.world import World
+from pca.enum import Entity
+from pca.engines.engine import Engine
+
+
+def conway_world(storage, size=24, layers=2, density=0.4, seed=0):
+    """Headless world of full Conway layers holding a random soup."""
+    world = World(size, size, layers, storage=storage, headless=True, seed=seed)
+    world.set_terrain_with_heightmap(Entity.CONWAY_CUBE, np.full((size, size), layers))
+    types, states = world.state_arrays()
+    states[np.random.default_rng(seed).random(types.shape) < density] = 1
+    world.load_state(types, states)
+    return world
+
+
+def history(world, generations, full=False):
+    steps = []
+    for _ in range(generations):
+        if full:
+            # Forget the changes, so that everything steps
+            world.mark_all_dirty()
+        world.evolve()
+        steps.append(world.state_arrays())
+    return steps
+
+
+def assert_same_history(first, second):
+    for generation, ((types, states), (other_types, other_states)) in enumerate(zip(first, second)):
+        assert np.array_equal(types, other_types), f"types differ at generation {generation}"
+        assert np.array_equal(states, other_states), f"states differ at generation {generation}"
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+def test_conway_engine_matches_cell_step(storage):
+    engine_world = conway_world(storage)
+    cell_world = conway_world(storage)
+    del cell_world.engines[Entity.CONWAY_CUBE]
+
+    assert_same_history(history(engine_world, 15), history(cell_world, 15))
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+@pytest.mark.parametrize("engine", [True, False])
+def test_active_set_matches_full_step(storage, engine):
+    active_world = conway_world(storage, density=0.2)
+    full_world = conway_world(storage, density=0.2)
+    if not engine:
+        del active_world.engines[Entity.CONWAY_CUBE]
+        del full_world.engines[Entity.CONWAY_CUBE]
+
+    assert_same_history(history(active_world, 30), history(full_world, 30, full=True))
+
+
+def test_engines_must_implement_advance():
+    class Incomplete(Engine):
+        entities = (Entity.CONWAY_CUBE,)
+
+    # Fails when the engine is created, not in the middle of evolve
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from pca.world import World
+from pca.enum import Entity
+from pca.grid import grid_arrays, state_hash
+from pca.instrumentation import Profiler
+
+
+def soup_world(storage, size=8, seed=0, **options):
+    world = World(size, size, 1, storage=storage, **options)
+    world.set_terrain_with_heightmap(Entity.CONWAY_CUBE, np.ones((size, size)))
+    types, states = world.state_arrays()
+    states[np.random.default_rng(seed).random(types.shape) < 0.4] = 1
+    world.load_state(types, states)
+    return world
+
+
+def brute_force_period(history, max_period):
+    """Smallest p such that the last state is the one p generations before, None if none is."""
+    last = history[-1]
+    for period in range(1, min(max_period, len(history) - 1) + 1):
+        if all(np.array_equal(a, b) for a, b in zip(last, history[-1 - period])):
+            return period
+    return None
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+@pytest.mark.parametrize("seed", range(4))
+def test_period_matches_brute_force(storage, seed):
+    world = soup_world(storage, seed=seed, headless=True)
+    world.max_period = 16
+    history = [world.state_arrays()]
+    periods = []
+    for generation in range(60):
+        if generation == 30:
+            # An edit forgets the past states
+            world.set_state(0, 0, 0, 1 - world.state_arrays()[1][0, 0, 0])
+            history = [world.state_arrays()]
+        world.evolve()
+        history.append(world.state_arrays())
+        assert world.period == brute_force_period(history, world.max_period)
+        assert world.state_hash() == state_hash(*grid_arrays(world.grid))
+        periods.append(world.period)
+    assert any(period is not None for period in periods)
+
+
+def test_run_stops_on_cycle():
+    world = World(8, 8, 1, storage="array", headless=True)
+    world.set_terrain_with_heightmap(Entity.CONWAY_CUBE, np.ones((8, 8)))
+    for x, y in [(3, 2), (3, 3), (3, 4)]:
+        world.set_state(x, y, 0, 1)
+    assert world.run(100) == 2
+    assert world.period == 2
+
+
+def test_random_worlds_have_no_period():
+    world = World(2, 1, 2, headless=True, seed=0)
+    world.set_terrain_with_heightmap(Entity.MAGIC_TERRAIN, np.ones((2, 1)))
+    # With so few states, they repeat all the time
+    assert world.run(50) == 50
+    assert world.period is None
+
+
+def terrain_arrays(frame):
+    trace = frame["data"][0]
+    return [np.asarray(getattr(trace, name)) for name in ("x", "y", "z", "i", "j", "k", "intensity")]
+
+
+def test_cycle_frames_are_reused():
+    profiler = Profiler()
+    world = soup_world("array", seed=1, instrumentation=profiler)
+    fresh = soup_world("array", seed=1)
+    for _ in range(20):
+        world.generate_frame()
+        world.evolve()
+        fresh.generate_frame()
+        fresh.renderer.frame_cache.clear()
+        fresh.evolve()
+
+    assert profiler.counters["frame/reused"] > 0
+    frames, fresh_frames = world.renderer.frames, fresh.renderer.frames
+    for frame, fresh_frame in zip(frames, fresh_frames, strict=True):
+        for array, fresh_array in zip(terrain_arrays(frame), terrain_arrays(fresh_frame)):
+            assert np.array_equal(array, fresh_array)
+
+
+def test_random_frames_are_not_reused():
+    profiler = Profiler()
+    world = World(2, 1, 2, seed=0, instrumentation=profiler)
+    world.set_terrain_with_heightmap(Entity.MAGIC_TERRAIN, np.ones((2, 1)))
+    for _ in range(10):
+        world.evolve()
+        world.generate_frame()
+    assert "frame/reused" not in profiler.counters
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from pca.world import World
+from pca.enum import Entity
+from pca.engines.conway import ConwayEngine
+from pca.engines.hashlife import HashLife
+
+
+def soup(size, box, seed=0):
+    """Random soup in a box x box square at the center of a size x size plane."""
+    alive = np.zeros((size, size), dtype=bool)
+    start = (size - box) // 2
+    alive[start:start + box, start:start + box] = np.random.default_rng(seed).random((box, box)) < 0.5
+    return alive
+
+
+def conway_steps(alive, generations):
+    types = np.full(alive.shape + (1,), Entity.CONWAY_CUBE, dtype=np.uint8)
+    states = alive[..., None].astype(np.int16)
+    for _ in range(generations):
+        types, states = ConwayEngine().advance(types, states)
+    return states[..., 0] == 1
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_hashlife_matches_conway_engine(seed):
+    # Patterns spread by at most one cell per generation, so the soup stays clear of the edges
+    generations = 24
+    alive = soup(64, 8, seed)
+
+    universe = HashLife(alive)
+    universe.advance(generations)
+
+    assert np.array_equal(universe.to_array(alive.shape), conway_steps(alive, generations))
+
+
+def test_hashlife_successive_advances():
+    alive = soup(64, 8, seed=3)
+    universe = HashLife(alive)
+    for generations in (1, 6, 13):
+        universe.advance(generations)
+    assert universe.generation == 20
+    assert np.array_equal(universe.to_array(alive.shape), conway_steps(alive, 20))
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+def test_leap_matches_evolve(storage):
+    worlds = []
+    for _ in range(2):
+        world = World(48, 48, 2, storage=storage, headless=True)
+        world.set_terrain_with_heightmap(Entity.CONWAY_CUBE, np.full((48, 48), 2))
+        types, states = world.state_arrays()
+        states[:, :, 0] = soup(48, 6, seed=4)
+        states[:, :, 1] = soup(48, 6, seed=5)
+        world.load_state(types, states)
+        worlds.append(world)
+
+    leaping, evolving = worlds
+    leaping.leap(7)
+    leaping.leap(10)
+    for _ in range(17):
+        evolving.evolve()
+
+    assert leaping.generation == evolving.generation == 17
+    for leaped, evolved in zip(leaping.state_arrays(), evolving.state_arrays()):
+        assert np.array_equal(leaped, evolved)
+
+
+def test_leap_needs_full_layers():
+    world = World(16, 16, 1, storage="array", headless=True)
+    world.set_terrain_with_heightmap(Entity.CONWAY_CUBE, np.ones((16, 16)))
+    world.set_entity(Entity.TERRAIN, 0, 0, 0)
+    with pytest.raises(ValueError):
+        world.leap(4)
+
+
+def test_leap_warns_when_cells_leave_the_world():
+    world = World(16, 16, 1, storage="array", headless=True)
+    world.set_terrain_with_heightmap(Entity.CONWAY_CUBE, np.ones((16, 16)))
+    for x, y in [(1, 0), (2, 1), (0, 2), (1, 2), (2, 2)]:
+        world.set_state(x + 8, y + 8, 0, 1)
+    with pytest.warns(UserWarning):
+        world.leap(64)
@@ -0,0 +1,43 @@
+import numpy as np
+
+from pca.world import World
+from pca.enum import Entity
+from pca.instrumentation import NULL_INSTRUMENTATION, Profiler
+
+
+def test_profiler_records_the_phases_of_each_frame():
+    records = []
+    profiler = Profiler(callback=records.append)
+    world = World(10, 10, 3, storage="array", seed=0, instrumentation=profiler)
+    world.set_terrain_with_heightmap(Entity.TERRAIN, np.ones((10, 10)))
+    world.set_entities([(2, 2, 1), (3, 3, 1)], Entity.CONWAY_CUBE)
+    world.set_entity_with_dict({(7, 7): Entity.RABBIT})
+
+    for _ in range(3):
+        world.evolve()
+        world.generate_frame()
+
+    assert len(profiler.frames) == 3 and records == profiler.frames
+    for record in records:
+        assert {"evolve", "evolve/sync_back", "evolve/hash", "frame/mesh"} <= set(record["phases"])
+        assert "evolve/engine/RABBIT" in record["phases"]
+        assert record["counters"]["frame/traces"] == 2
+
+    totals = profiler.report()["totals"]
+    assert totals["phases"]["evolve"]["calls"] == 3
+    assert totals["counters"]["evolve/changed_cells"] == sum(
+        record["counters"].get("evolve/changed_cells", 0) for record in records
+    )
+    assert "evolve/engine/RABBIT" in profiler.summary()
+
+    with profiler.phase("custom"):
+        pass
+    assert profiler.current["phases"]["custom"] >= 0
+
+
+def test_worlds_default_to_the_null_instrumentation():
+    world = World(4, 4, 2, headless=True)
+    assert world.instrumentation is NULL_INSTRUMENTATION
+    with NULL_INSTRUMENTATION.phase("anything"):
+        NULL_INSTRUMENTATION.count("anything")
+    assert not NULL_INSTRUMENTATION.enabled
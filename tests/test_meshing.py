@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from pca.display.meshing import (
+    FACE_NEIGHBORS, TERRAIN_LUT, deduplicate_lattice_vertices, exposed_faces, merge_faces, mesh_terrain, split_quads, terrain_color_table,
+)
+from pca.enum import Entity
+
+
+def terrain(shape=(13, 11, 5), seed=0):
+    """Random heightmap terrain with a few colors, and its color table."""
+    rng = np.random.default_rng(seed)
+    heights = rng.integers(1, shape[2] + 1, shape[:2])
+    solid = np.arange(shape[2])[None, None, :] < heights[..., None]
+    keys = rng.integers(0, 3, shape)
+    color_table = rng.integers(0, 20, (3, 12))
+    return solid, keys, color_table
+
+
+def unit_faces(origins, sizes, intensities, face):
+    """Split the rectangles of a face direction into the set of their unit faces."""
+    normal_axis = FACE_NEIGHBORS[face][0]
+    faces = set()
+    for origin, size, pair in zip(origins.tolist(), sizes.tolist(), intensities.tolist()):
+        assert size[normal_axis] == 1
+        for offset in np.ndindex(*size):
+            faces.add((tuple(np.add(origin, offset).tolist()), tuple(pair)))
+    return faces
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_greedy_covers_the_same_faces(seed):
+    solid, keys, color_table = terrain(seed=seed)
+    masks = exposed_faces(solid)
+
+    for face in range(1, 6):
+        origins, sizes, intensities = merge_faces(masks[face], keys, color_table, face)
+        single = np.argwhere(masks[face])
+        single_intensities = color_table[keys[masks[face]]][:, 2 * face:2 * face + 2]
+
+        greedy_faces = unit_faces(origins, sizes, intensities, face)
+        assert len(greedy_faces) == len(single)
+        assert greedy_faces == unit_faces(single, np.ones_like(single), single_intensities, face)
+
+
+@pytest.mark.parametrize("greedy", [False, True])
+def test_split_regions_match_separate_meshes(greedy):
+    solid, keys, color_table = terrain(seed=2)
+    masks = exposed_faces(solid)
+    chunk_size = 4
+
+    # Chunk ids of the (x, y) columns
+    cx = np.arange(solid.shape[0]) // chunk_size
+    cy = np.arange(solid.shape[1]) // chunk_size
+    n_cy = cy[-1] + 1
+    regions = np.broadcast_to((cx[:, None] * n_cy + cy[None, :])[:, :, None], solid.shape)
+
+    *mesh, quad_regions = mesh_terrain(solid, keys, color_table, masks, greedy, regions)
+    meshes = split_quads(*mesh, quad_regions)
+
+    for x in range(0, solid.shape[0], chunk_size):
+        for y in range(0, solid.shape[1], chunk_size):
+            block = (slice(x, x + chunk_size), slice(y, y + chunk_size))
+            vertices, faces, intensities = mesh_terrain(
+                solid[block], keys[block], color_table, masks[(slice(None),) + block], greedy,
+            )
+            split = meshes.get(int(regions[x, y, 0]))
+            if split is None:
+                assert len(faces) == 0
+                continue
+            assert np.array_equal(split[0], vertices + [x, y, 0])
+            assert np.array_equal(split[1], faces)
+            assert np.array_equal(split[2], intensities)
+
+
+
+def test_color_table_ignores_the_states_of_other_voxels():
+    types = np.full((4, 3, 2), Entity.TERRAIN, dtype=np.uint8)
+    types[0] = Entity.RABBIT
+    states = np.zeros(types.shape, dtype=np.int16)
+    states[1, 0, 0] = -2
+    states[2, 0, 0] = 3
+    # Far out of the range of the terrain states
+    states[0, 0, 0], states[0, 0, 1] = 1000, -1000
+    solid = TERRAIN_LUT[types]
+    assert not solid[0].any()
+
+    calls = []
+    def get_colors(entity, state, position):
+        calls.append((entity, state))
+        return np.full(12, len(calls))
+
+    keys, color_table = terrain_color_table(types, states, solid, get_colors)
+
+    assert sorted(calls) == [(Entity.TERRAIN, -2), (Entity.TERRAIN, 0), (Entity.TERRAIN, 3)]
+    assert np.all(keys[~solid] == 0)
+    assert keys.min() >= 0 and keys.max() < len(color_table)
+    # Every terrain voxel gets the colors of its own state
+    state_colors = {state: calls.index((Entity.TERRAIN, state)) + 1 for state in (-2, 0, 3)}
+    for position in np.argwhere(solid):
+        assert color_table[keys[tuple(position)], 0] == state_colors[states[tuple(position)]]
+
+    masks = exposed_faces(solid)
+    for face in range(6):
+        merge_faces(masks[face], keys, color_table, face)
+
+
+@pytest.mark.parametrize("count", [10, 5000])
+def test_deduplicate_lattice_vertices(count):
+    # Few vertices in a large grid take the sorting path, many the lattice one
+    grid_size = (40, 30, 6)
+    rng = np.random.default_rng(0)
+    vertices = np.column_stack([rng.integers(0, size + 1, count) for size in grid_size])
+    faces = rng.integers(0, count, (count, 3))
+
+    unique_vertices, new_faces = deduplicate_lattice_vertices(vertices, faces, grid_size)
+
+    expected = np.unique(vertices, axis=0)
+    assert np.array_equal(unique_vertices, expected)
+    assert np.array_equal(unique_vertices[new_faces], vertices[faces])
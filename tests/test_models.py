@@ -0,0 +1,25 @@
+import numpy as np
+
+from pca.display.models import ModelLoader
+from pca.enum import Entity
+
+
+def test_cached_model_matches_loaded_model(tmp_path):
+    loaded = ModelLoader(cache_dir=tmp_path).get_model(Entity.RABBIT)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    cached = ModelLoader(cache_dir=tmp_path).get_model(Entity.RABBIT)
+    # Read back from the cache, without loading the mesh
+    assert cached["mesh"] is None
+    for name in ("vertices", "faces", "vertex_colors", "floor_vertices"):
+        assert np.array_equal(cached[name], loaded[name])
+
+
+def test_models_are_loaded_lazily(tmp_path):
+    loader = ModelLoader(cache_dir=tmp_path)
+    assert loader.models == {}
+
+    box = loader.get_model(Entity.TERRAIN)
+    assert loader.get_model(Entity.CONWAY_CUBE) is box
+    assert list(loader.models) == [Entity.TERRAIN, Entity.CONWAY_CUBE]
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from pca.world import World
+from pca.enum import Entity
+from pca.engines.agents import AgentEngine
+from pca.engines.conway import ConwayEngine
+from pca.engines.magic import MagicTerrainEngine
+from pca.engines.parallel import ParallelEngine
+from pca.engines.rules import OuterTotalisticRule
+
+
+def rule_soup(shape=(21, 9, 7), seed=1):
+    rng = np.random.default_rng(seed)
+    types = np.where(rng.random(shape) < 0.3, Entity.RULE_CUBE, 0).astype(np.uint8)
+    return types, (types != 0).astype(np.int16)
+
+
+@pytest.mark.parametrize("rule", ["B3/S23", "B5/S45", "B2/S/C4"])
+def test_parallel_engine_matches_serial(rule):
+    engine = OuterTotalisticRule.from_string(rule)
+    types, states = rule_soup()
+
+    serial = (types, states)
+    with ParallelEngine(engine, processes=3) as parallel_engine:
+        parallel = (types, states)
+        for _ in range(6):
+            serial = engine.advance(*serial)
+            parallel = parallel_engine.advance(*parallel)
+            assert np.array_equal(serial[0], parallel[0])
+            assert np.array_equal(serial[1], parallel[1])
+
+
+def test_parallel_leap_matches_serial():
+    engine = OuterTotalisticRule.from_string("B2/S/C4")
+    types, states = rule_soup()
+
+    serial = (types, states)
+    for _ in range(9):
+        serial = engine.advance(*serial)
+
+    with ParallelEngine(engine, processes=4) as parallel_engine:
+        parallel = parallel_engine.leap(types, states, 4)
+        parallel = parallel_engine.leap(*parallel, 5)
+    assert np.array_equal(serial[0], parallel[0])
+    assert np.array_equal(serial[1], parallel[1])
+
+
+def conway_world(seed=0):
+    world = World(30, 30, 1, storage="array", headless=True)
+    world.set_terrain_with_heightmap(Entity.CONWAY_CUBE, np.ones((30, 30)))
+    types, states = world.state_arrays()
+    states[np.random.default_rng(seed).random(types.shape) < 0.4] = 1
+    world.load_state(types, states)
+    return world
+
+
+def test_parallel_engine_in_world_matches_serial():
+    serial, parallel = conway_world(), conway_world()
+    with ParallelEngine(ConwayEngine(), processes=4) as parallel_engine:
+        parallel.register_engine(parallel_engine)
+        for generation in range(12):
+            if generation == 4:
+                for world in (serial, parallel):
+                    world.set_state(3, 3, 0, 1)
+                    world.set_state(3, 4, 0, 1)
+            if generation == 8:
+                for world in (serial, parallel):
+                    world.mark_all_dirty()
+            serial.evolve()
+            parallel.evolve()
+            assert np.array_equal(serial.grid.states, parallel.grid.states)
+            assert np.array_equal(serial.changed, parallel.changed)
+            assert serial.state_hash() == parallel.state_hash()
+
+        # The world steps in the shared buffers
+        assert parallel_engine.buffer_of(parallel.grid) is not None
+
+    # The grids get arrays of their own back
+    assert parallel_engine.buffer_of(parallel.grid) is None
+    serial.evolve()
+    del parallel.engines[Entity.CONWAY_CUBE]
+    parallel.register_engine(ConwayEngine())
+    parallel.evolve()
+    assert np.array_equal(serial.grid.states, parallel.grid.states)
+
+
+def test_parallel_leap_in_world():
+    serial, parallel = conway_world(), conway_world()
+    for _ in range(10):
+        serial.evolve()
+    with ParallelEngine(ConwayEngine(), processes=2) as parallel_engine:
+        parallel.leap(10, parallel_engine)
+    assert np.array_equal(serial.grid.states, parallel.grid.states)
+
+
+@pytest.mark.parametrize("engine", [MagicTerrainEngine(), AgentEngine(Entity.RABBIT)])
+def test_parallel_engine_rejects_stochastic_engines(engine):
+    with pytest.raises(ValueError):
+        ParallelEngine(engine, processes=2)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from pca.world import World
+from pca.enum import Entity
+from pca.recorder import StateRecorder
+
+
+def blinker_world():
+    world = World(8, 8, 2, storage="array", meshing="vectorized")
+    world.set_terrain_with_heightmap(Entity.CONWAY_CUBE, np.ones((8, 8)))
+    for x, y in [(3, 2), (3, 3), (3, 4)]:
+        world.set_state(x, y, 0, 1)
+    world.set_entity_with_dict({(6, 6): Entity.RABBIT})
+    return world
+
+
+def test_recording_round_trip(tmp_path):
+    world = World(10, 10, 3, headless=True, seed=0)
+    world.set_terrain_with_heightmap(Entity.MAGIC_TERRAIN, np.full((10, 10), 2))
+    recorder = StateRecorder(tmp_path, world.grid_size)
+
+    expected = []
+    for _ in range(5):
+        world.record(recorder)
+        expected.append(world.state_arrays())
+        world.evolve()
+
+    reopened = StateRecorder(tmp_path, readonly=True)
+    assert len(reopened) == 5
+    for (step, types, states), (expected_types, expected_states) in zip(reopened.steps(), expected):
+        assert np.array_equal(types, expected_types)
+        assert np.array_equal(states, expected_states)
+    assert [step for step, _, _ in reopened.steps(1, None, 2)] == [1, 3]
+
+
+def test_partial_step_is_dropped(tmp_path):
+    recorder = StateRecorder(tmp_path, (2, 2, 2))
+    types = np.ones((2, 2, 2), dtype=np.uint8)
+    recorder.record(types, np.zeros((2, 2, 2), dtype=np.int16))
+    with open(recorder.file("types"), "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    recorder = StateRecorder(tmp_path)
+    assert len(recorder) == 1
+    recorder.record(types, np.ones((2, 2, 2), dtype=np.int16))
+    assert np.array_equal(recorder.get(1)[1], np.ones((2, 2, 2)))
+    with pytest.raises(ValueError):
+        recorder.record(types[:1], types[:1])
+
+
+def frame_arrays(figure):
+    """The coordinates and intensities of the terrain trace of each frame."""
+    base = figure.data[0]
+    return [
+        tuple(np.asarray(getattr(frame.data[0] if 0 in frame.traces else base, name)) for name in ("x", "i", "intensity"))
+        for frame in figure.frames
+    ]
+
+
+def test_render_recording_matches_live_frames(tmp_path):
+    live = blinker_world()
+    recorder = StateRecorder(tmp_path, live.grid_size)
+    for _ in range(4):
+        live.record(recorder)
+        live.generate_frame()
+        live.evolve()
+
+    replayed = blinker_world()
+    replay = frame_arrays(replayed.render_recording(recorder))
+    for live_frame, replayed_frame in zip(frame_arrays(live.render()), replay, strict=True):
+        for live_array, replayed_array in zip(live_frame, replayed_frame):
+            assert np.array_equal(live_array, replayed_array)
+
+
+@pytest.mark.parametrize("meshing", ["vectorized", "greedy"])
+def test_parallel_meshing_matches_serial(tmp_path, meshing):
+    world = blinker_world()
+    recorder = StateRecorder(tmp_path, world.grid_size)
+    for _ in range(5):
+        world.record(recorder)
+        world.evolve()
+
+    serial, parallel = World(8, 8, 2, meshing=meshing), World(8, 8, 2, meshing=meshing)
+    serial_frames = frame_arrays(serial.render_recording(recorder, stride=2))
+    parallel_frames = frame_arrays(parallel.render_recording(recorder, stride=2, processes=2))
+    assert len(parallel_frames) == 3
+    for serial_frame, parallel_frame in zip(serial_frames, parallel_frames, strict=True):
+        for serial_array, parallel_array in zip(serial_frame, parallel_frame):
+            assert np.array_equal(serial_array, parallel_array)
@@ -0,0 +1,89 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from pca.world import World
+from pca.enum import Entity
+
+
+def terrain_world(storage, meshing, seed=0, chunk_size=16):
+    """Random terrain of two types with holes and a few rabbits on top."""
+    world = World(9, 8, 6, storage=storage, chunk_size=chunk_size, meshing=meshing)
+    rng = np.random.default_rng(seed)
+    world.set_terrain_with_heightmap(Entity.TERRAIN, rng.integers(0, 5, (9, 8)))
+    for x, y, z in rng.integers(0, (9, 8, 5), (25, 3)).tolist():
+        world.set_entity(Entity.COLORFUL_TERRAIN if x % 2 else None, x, y, z)
+    world.set_entity_with_dict({(1, 1): Entity.RABBIT, (5, 3): Entity.RABBIT})
+    return world
+
+
+def terrain_triangles(world):
+    """The terrain triangles of a new frame, as a multiset of (corners, intensity)."""
+    world.generate_frame()
+    renderer = world.renderer
+    vertices = np.round(np.asarray(renderer.terrain_vertices, dtype=float), 4)
+    return Counter(
+        (tuple(sorted(map(tuple, vertices[face].tolist()))), int(intensity))
+        for face, intensity in zip(np.asarray(renderer.terrain_faces), np.asarray(renderer.intensity_values))
+    )
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+def test_vectorized_matches_cells(storage):
+    cells = terrain_triangles(terrain_world(storage, "cells"))
+    vectorized = terrain_triangles(terrain_world(storage, "vectorized"))
+    assert sum(cells.values()) > 0
+    assert vectorized == cells
+
+
+@pytest.mark.parametrize("meshing", ["vectorized", "greedy"])
+@pytest.mark.parametrize("chunk_size", [2, 3, 16])
+def test_chunk_cache_matches_fresh_meshing(meshing, chunk_size):
+    world = terrain_world("array", meshing, chunk_size=chunk_size)
+    terrain_triangles(world)
+
+    # Only the chunks around the edits are meshed again
+    rng = np.random.default_rng(1)
+    for x, y, z in rng.integers(0, (9, 8, 6), (6, 3)).tolist():
+        world.set_entity(Entity.TERRAIN if z % 2 else None, x, y, z)
+    cached = terrain_triangles(world)
+
+    # Greedy quads do not cross the chunks, so the fresh world has the same ones
+    fresh = World(9, 8, 6, storage="array", chunk_size=chunk_size, meshing=meshing)
+    fresh.load_state(*world.state_arrays())
+    assert cached == terrain_triangles(fresh)
+
+
+def test_frames_only_carry_changing_traces():
+    world = World(8, 8, 4, storage="array", seed=0)
+    world.set_terrain_with_heightmap(Entity.TERRAIN, np.full((8, 8), 2))
+    world.set_entity_with_dict({(2, 2): Entity.RABBIT, (5, 5): Entity.RABBIT})
+    world.generate_frame()
+    for _ in range(4):
+        world.evolve()
+        world.generate_frame()
+
+    figure = world.render()
+    # The terrain never changes, it is only in the base figure
+    assert len(figure.data) == 2
+    assert all(list(frame.traces) == [1] for frame in figure.frames)
+    assert len(figure.frames) == 5
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+def test_entities_are_batched_by_type(storage):
+    world = World(8, 8, 4, storage=storage, seed=0)
+    world.set_terrain_with_heightmap(Entity.TERRAIN, np.full((8, 8), 1))
+    rabbits = {(x, y): Entity.RABBIT for x, y in [(0, 0), (2, 5), (7, 7)]}
+    world.set_entity_with_dict(rabbits)
+    # A type without Cell class is not drawn
+    world.set_entity(Entity.TREE, 4, 4, 1)
+    world.set_entities([(1, 1, 2), (1, 2, 2)], Entity.MAGIC_TERRAIN)
+    world.generate_frame()
+
+    terrain, *entities = world.renderer.frames[0]["data"]
+    assert len(entities) == 1
+    model = world.get_model(Entity.RABBIT)
+    assert len(entities[0].x) == len(rabbits) * len(model["vertices"])
+    assert len(entities[0].i) == len(rabbits) * len(model["faces"])
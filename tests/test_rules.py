@@ -0,0 +1,62 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from pca.enum import Entity
+from pca.engines.rules import OuterTotalisticRule
+
+
+def reference_step(rule, types, states):
+    """One generation of the rule computed cell by cell, the cells past the edges being dead."""
+    new_types, new_states = types.copy(), states.copy()
+    alive = (types == rule.entity) & (states == 1)
+    for position in itertools.product(*(range(size) for size in types.shape)):
+        count = 0
+        for offset in rule.offsets:
+            neighbor = tuple(np.add(position, offset))
+            if all(0 <= i < size for i, size in zip(neighbor, types.shape)):
+                count += alive[neighbor]
+
+        own = types[position] == rule.entity
+        state = states[position]
+        if types[position] == 0 or (own and state == 0):
+            if count in rule.birth:
+                new_types[position], new_states[position] = rule.entity, 1
+        elif own and state >= 1 and (state >= 2 or count not in rule.survival):
+            new_states[position] = state + 1
+            if new_states[position] >= rule.states:
+                new_types[position], new_states[position] = 0, 0
+    return new_types, new_states
+
+
+@pytest.mark.parametrize("rule, neighborhood, radius", [
+    ("B5/S45", "moore", 1),
+    ("B4-5/S5,6,7", "moore", 1),
+    ("B2/S/C4", "moore", 1),
+    ("B1/S1,2/C3", "von_neumann", 1),
+    ("B5-8/S6-9", "moore", 2),
+])
+def test_rule_matches_reference(rule, neighborhood, radius):
+    engine = OuterTotalisticRule.from_string(rule, neighborhood, radius)
+    rng = np.random.default_rng(0)
+    # Some cells of another type, that the rule must neither count nor change
+    types = rng.choice([0, Entity.RULE_CUBE, Entity.TERRAIN], size=(7, 6, 5), p=[0.5, 0.4, 0.1]).astype(np.uint8)
+    states = np.where(types == Entity.RULE_CUBE, rng.integers(0, engine.states, types.shape), 0).astype(np.int16)
+
+    for _ in range(4):
+        expected = reference_step(engine, types, states)
+        types, states = engine.advance(types, states)
+        assert np.array_equal(types, expected[0])
+        assert np.array_equal(states, expected[1])
+
+
+def test_rule_parsing():
+    rule = OuterTotalisticRule.from_string("b4-5/s5,6,7/c3")
+    assert (rule.birth, rule.survival, rule.states) == ([4, 5], [5, 6, 7], 3)
+
+    rule = OuterTotalisticRule.from_string("B36/S23")
+    assert (rule.birth, rule.survival, rule.states) == ([3, 6], [2, 3], 2)
+
+    with pytest.raises(ValueError):
+        OuterTotalisticRule.from_string("B3/X23")
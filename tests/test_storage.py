@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from pca.world import World
+from pca.enum import Entity
+from pca.objects.conway_cell import ConwayCell
+from pca.objects.terrain import Terrain
+from pca.objects.tree import Tree
+
+
+def mixed_world(storage):
+    """Magic terrain with rabbits on it, and a Conway layer with a soup."""
+    world = World(12, 12, 6, storage=storage, headless=True, seed=0)
+    rng = np.random.default_rng(0)
+    world.set_terrain_with_heightmap(Entity.MAGIC_TERRAIN, rng.integers(1, 4, (12, 6)))
+    world.set_entity_with_dict({(x, y): Entity.RABBIT for x, y in rng.integers(0, (12, 6), (6, 2)).tolist()})
+    world.set_entities([(x, y, 0) for x in range(12) for y in range(6, 12)], Entity.CONWAY_CUBE)
+    world.set_entities([(x, y, 1) for x in range(12) for y in range(6, 12)], Entity.TERRAIN)
+    for x, y in rng.integers(0, (12, 6), (30, 2)).tolist():
+        world.set_state(x, y + 6, 0, 1)
+    world.set_cell(0, 11, 5, ConwayCell(state=1, x=0, y=11, z=5))
+    return world
+
+
+def test_storages_evolve_the_same():
+    object_world, array_world = mixed_world("object"), mixed_world("array")
+    for _ in range(15):
+        for object_array, array_array in zip(object_world.state_arrays(), array_world.state_arrays()):
+            assert np.array_equal(object_array, array_array)
+        assert object_world.state_hash() == array_world.state_hash()
+        assert object_world.period == array_world.period
+        object_world.evolve()
+        array_world.evolve()
+
+
+def test_storages_give_the_same_cells():
+    object_world, array_world = mixed_world("object"), mixed_world("array")
+    for x, y, z in np.ndindex(*object_world.grid_size):
+        object_cell, array_cell = object_world.get_cell(x, y, z), array_world.get_cell(x, y, z)
+        if object_cell is None:
+            assert array_cell is None
+        else:
+            assert type(array_cell) is type(object_cell)
+            assert (array_cell.state, array_cell.x, array_cell.y, array_cell.z) == (object_cell.state, x, y, z)
+
+
+def test_array_storage_rejects_cells_it_cannot_build_again():
+    class Tunnel(Terrain):
+        __slots__ = ()
+
+    world = World(3, 3, 3, storage="array", headless=True)
+    for cell in (Tree(x=1, y=1, z=1), Tunnel(x=1, y=1, z=1)):
+        with pytest.raises(ValueError):
+            world.set_cell(1, 1, 1, cell)
+    assert world.get_cell(1, 1, 1) is None
+    assert world.state_hash() == 0
+
+    world.set_cell(1, 1, 1, Terrain(x=1, y=1, z=1))
+    assert type(world.get_cell(1, 1, 1)) is Terrain
+    world.set_cell(1, 1, 1, None)
+    assert world.get_cell(1, 1, 1) is None
+
+
+def test_unbuildable_types_leave_cells_empty():
+    for storage in ("object", "array"):
+        world = World(3, 3, 3, storage=storage, headless=True)
+        world.set_entity(Entity.TREE, 0, 0, 0)
+        world.set_entities([(1, 1, 1), (2, 2, 2)], [Entity.TREE, Entity.TERRAIN])
+        world.set_terrain_with_heightmap(Entity.TREE, np.ones((3, 3)))
+        types, _ = world.state_arrays()
+        assert np.flatnonzero(types).tolist() == [np.ravel_multi_index((2, 2, 2), (3, 3, 3))]
@@ -0,0 +1,131 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pca.world import World
+from pca.enum import Entity
+
+
+def test_headless_world_never_imports_the_display():
+    script = (
+        "import sys\n"
+        "from pca.world import World\n"
+        "from pca.enum import Entity\n"
+        "world = World(6, 6, 3, headless=True, seed=0)\n"
+        "world.set_terrain_with_heightmap(Entity.MAGIC_TERRAIN, [[1] * 6] * 6)\n"
+        "world.set_entity_with_dict({(1, 1): Entity.RABBIT})\n"
+        "world.run(5)\n"
+        "assert not {'plotly', 'trimesh'} & set(sys.modules), sorted(sys.modules)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=Path(__file__).parent.parent)
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+def test_headless_world_renders_later(storage):
+    world = World(6, 6, 3, storage=storage, headless=True, seed=0)
+    world.set_terrain_with_heightmap(Entity.TERRAIN, np.ones((6, 6)))
+    world.set_entity_with_dict({(1, 1): Entity.RABBIT})
+    assert world.renderer is None and world.loader is None
+
+    world.generate_frame()
+    figure = world.render()
+    assert len(figure.data) == 2
+    assert len(figure.data[1].x) == len(world.get_model(Entity.RABBIT)["vertices"])
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+def test_bulk_construction_matches_per_cell(storage):
+    rng = np.random.default_rng(0)
+    heights = rng.integers(0, 5, (7, 6))
+    positions = rng.integers(0, (8, 6, 5), (30, 3))
+    entities = rng.choice([None, Entity.MAGIC_TERRAIN, Entity.TREE, Entity.RULE_CUBE], len(positions))
+    rabbits = {(1, 1): Entity.RABBIT, (4, 2): Entity.RABBIT, (9, 9): Entity.RABBIT}
+
+    bulk = World(8, 6, 5, storage=storage, headless=True)
+    bulk.set_terrain_with_heightmap(Entity.TERRAIN, heights)
+    bulk.set_entities(positions, list(entities))
+    bulk.set_entities(positions[:5], Entity.COLORFUL_TERRAIN)
+    bulk.set_entity_with_dict(rabbits)
+
+    single = World(8, 6, 5, storage=storage, headless=True)
+    for x, y in np.ndindex(*heights.shape):
+        for z in range(heights[x, y]):
+            single.set_entity(Entity.TERRAIN, x, y, z)
+    for (x, y, z), entity in zip(positions.tolist(), entities):
+        single.set_entity(entity, x, y, z)
+    for x, y, z in positions[:5].tolist():
+        single.set_entity(Entity.COLORFUL_TERRAIN, x, y, z)
+    for (x, y), entity in rabbits.items():
+        if x < 8 and y < 6:
+            single.set_entity(entity, x, y, single.find_lowest_z(x, y))
+
+    for bulk_array, single_array in zip(bulk.state_arrays(), single.state_arrays()):
+        assert np.array_equal(bulk_array, single_array)
+    assert np.count_nonzero(bulk.state_arrays()[0] == Entity.RABBIT) == 2
+    assert bulk.state_hash() == single.state_hash()
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+def test_heightmap_out_of_bounds(storage):
+    world = World(4, 4, 3, storage=storage, headless=True)
+    with pytest.raises(IndexError):
+        world.set_terrain_with_heightmap(Entity.TERRAIN, np.full((4, 4), 4))
+    with pytest.raises(IndexError):
+        world.set_terrain_with_heightmap(Entity.TERRAIN, np.ones((5, 4)))
+    # A smaller height map fills the first columns
+    world.set_terrain_with_heightmap(Entity.TERRAIN, np.full((2, 3), 3))
+    assert np.count_nonzero(world.state_arrays()[0]) == 18
+
+
+def glider_world(storage):
+    world = World(12, 12, 2, storage=storage, headless=True)
+    world.set_terrain_with_heightmap(Entity.CONWAY_CUBE, np.full((12, 12), 2))
+    for x, y in [(1, 0), (2, 1), (0, 2), (1, 2), (2, 2)]:
+        world.set_state(x + 2, y + 2, 0, 1)
+    return world
+
+
+def fresh_copy(world):
+    copy = World(*world.grid_size, storage=world.storage, headless=True)
+    copy.load_state(*world.state_arrays())
+    return copy
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+def test_double_buffer_swaps_two_grids(storage):
+    world = glider_world(storage)
+    world.evolve()
+    first, second = world.back, world.grid
+    for generation in range(6):
+        world.evolve()
+        assert (world.grid, world.back) == ((first, second) if generation % 2 == 0 else (second, first))
+
+
+@pytest.mark.parametrize("storage", ["object", "array"])
+def test_double_buffer_sees_edits(storage):
+    world = glider_world(storage)
+    for generation in range(8):
+        if generation == 2:
+            world.set_state(8, 8, 1, 1)
+            world.set_state(8, 9, 1, 1)
+            world.set_state(8, 10, 1, 1)
+        if generation == 4:
+            world.set_entity(Entity.TERRAIN, 0, 11, 1)
+        if generation == 5:
+            # Written behind the back of the world, then flagged
+            if storage == "array":
+                world.grid.states[5, 5, 1] = 1
+            else:
+                world.grid[5, 5, 1].update(1)
+            world.mark_dirty(5, 5, 1)
+        if generation == 6:
+            world.mark_all_dirty()
+
+        expected = fresh_copy(world)
+        world.evolve()
+        expected.evolve()
+        for array, expected_array in zip(world.state_arrays(), expected.state_arrays()):
+            assert np.array_equal(array, expected_array)
@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+
+from pca.world import World
+from pca.enum import Entity
+
+
+def blinker_world():
+    world = World(8, 8, 2, storage="array", seed=0)
+    world.set_terrain_with_heightmap(Entity.CONWAY_CUBE, np.ones((8, 8)))
+    for x, y in [(3, 2), (3, 3), (3, 4)]:
+        world.set_state(x, y, 0, 1)
+    world.set_entity_with_dict({(6, 6): Entity.RABBIT})
+    return world
+
+
+def test_streamed_json_matches_rendered_figure(tmp_path):
+    streamed = blinker_world()
+    streamed.stream_to(tmp_path / "streamed.json")
+    rendered = blinker_world()
+    for world in (streamed, rendered):
+        for _ in range(4):
+            world.generate_frame()
+            world.evolve()
+    streamed.close_stream()
+
+    output = json.loads((tmp_path / "streamed.json").read_text())
+    expected = json.loads(rendered.render().to_json())
+
+    assert output["data"] == expected["data"]
+    for frame, expected_frame in zip(output["frames"], expected["frames"], strict=True):
+        # render only hides the color scale of the base traces
+        for trace in frame["data"]:
+            assert trace.pop("showscale") is False
+        assert frame == expected_frame
+    assert output["layout"]["sliders"] == expected["layout"]["sliders"]
+    # Only the current frame was kept
+    assert streamed.renderer.frames == []
+    assert list(tmp_path.iterdir()) == [tmp_path / "streamed.json"]
+
+
+def test_streamed_html_holds_the_frames(tmp_path):
+    world = blinker_world()
+    world.stream_to(tmp_path / "streamed.html", include_plotlyjs=False, auto_play=True)
+    for _ in range(3):
+        world.generate_frame()
+        world.evolve()
+    world.close_stream()
+
+    html = (tmp_path / "streamed.html").read_text()
+    assert "PCA_FRAMES" not in html
+    assert html.count('"name": "frame_') == 3
+    assert "Plotly.addFrames" in html and "Plotly.animate" in html